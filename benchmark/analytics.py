@@ -0,0 +1,43 @@
+""" 新しい足1本ごとの更新: `FundingZScore.update` (running sums) と全期間のpandas rollingの再計算の比較。
+
+python benchmark/analytics.py [--size 5000] [--window 21]
+"""
+import timeit
+import random
+
+import pandas as pd
+
+from pycoinglass import DataParser, FundingRateChart
+from pycoinglass.analytics import FundingZScore
+from pycoinglass.server import PAYLOADS
+
+
+def recompute(df, window):
+    df = df.drop(columns='price')
+    rolling = df.rolling(window)
+    return ((df - rolling.mean()) / rolling.std()).iloc[-1:]
+
+
+def main(size, window, number=200):
+    random.seed(0)
+    chart = DataParser.funding_rate_chart(PAYLOADS['funding_rate_chart'](size))
+    predicted = chart.predicted
+    zscore = FundingZScore(window)
+    zscore.update(FundingRateChart(predicted.iloc[:-1], chart.following))
+    bar = FundingRateChart(predicted.iloc[-1:], chart.following.iloc[:0])
+
+    incremental = timeit.timeit(lambda: zscore.update(bar), number=number) / number
+    full = timeit.timeit(lambda: recompute(predicted, window), number=number) / number
+    print(f"size={size} window={window} columns={predicted.shape[1] - 1}")
+    print(f"{'running sums':20s} {incremental * 1000:8.3f} ms/bar")
+    print(f"{'pandas rolling':20s} {full * 1000:8.3f} ms/bar")
+    pd.testing.assert_frame_equal(zscore.update(bar), recompute(predicted, window), check_freq=False, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=21)
+    args = parser.parse_args()
+    main(args.size, args.window)
@@ -0,0 +1,26 @@
+""" return_df="compact" (DataParser.compact) によるメモリ削減量 (bytes/row)。
+
+python benchmark/compact.py [--size 10000]
+"""
+import random
+
+from pycoinglass import DataParser
+from data_parser import PAYLOADS
+
+
+def main(size):
+    random.seed(0)
+    print(f"{'parser':30s} {'before':>10s} {'after':>10s}")
+    for name, make_payload in PAYLOADS.items():
+        df = getattr(DataParser, name)(make_payload(size))
+        compact = DataParser.compact(df, DataParser.SCHEMAS.get(name))
+        before, after = DataParser.bytes_per_row(df), DataParser.bytes_per_row(compact)
+        print(f"{name:30s} {before:10.1f} {after:10.1f}")
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.size)
@@ -0,0 +1,57 @@
+""" DataParserのベンチマーク (合成データ、もしくは `pycoinglass.replay.record` で記録したfixture)。
+
+python benchmark/data_parser.py [--size 10000] [--number 5] [--fixtures fixtures]
+"""
+import sys
+import json
+import timeit
+import random
+
+from pycoinglass import DataParser
+from pycoinglass.replay import load_fixtures
+from pycoinglass.server import PAYLOADS, ROUTES
+
+
+def fixture_payloads(directory):
+    """ 記録したfixtureをDataParserのメソッドごとに1つずつ返す。 """
+    payloads = {}
+    for key, fixture in load_fixtures(directory).items():
+        path = key.split("?")[0]
+        if path not in ROUTES or fixture['status_code'] != 200:
+            continue
+        data = json.loads(fixture['body'])['data']
+        if path == "/api/futures/v2/marginMarketCap":
+            data = data[fixture['params']['symbol']]
+        payloads.setdefault(ROUTES[path], data)
+    return payloads
+
+
+def rows(result):
+    if isinstance(result, tuple):
+        return sum(len(df) for df in result)
+    return len(result)
+
+
+def main(size, number, fixtures=None):
+    random.seed(0)
+    if fixtures is None:
+        payloads = {name: make_payload(size) for name, make_payload in PAYLOADS.items()}
+        print(f"size={size} number={number}")
+    else:
+        payloads = fixture_payloads(fixtures)
+        print(f"fixtures={fixtures} number={number}")
+
+    for name, payload in payloads.items():
+        parser = getattr(DataParser, name)
+        sec = min(timeit.repeat(lambda: parser(payload), number=number, repeat=3)) / number
+        print(f"{name:30s} {sec * 1000:10.2f} ms {rows(parser(payload)) / sec:14,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--fixtures")
+    args = parser.parse_args()
+    sys.exit(main(args.size, args.number, args.fixtures))
@@ -0,0 +1,52 @@
+""" `import pycoinglass` の時間 (新しいprocessで計測) と、pandas/numpy/requestsがimportされていないことの確認。
+
+`--budget` (default: 0.3秒) を超えた場合やparse層がimportされていた場合は終了コード1を返す。
+tests/test_import_time.pyは `HEAVY` と `measure` を使って、parse層がimportされないことだけを確認する。
+
+python benchmark/import_time.py [--repeat 10] [--budget 0.3]
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'numpy', 'requests', 'pycoinglass.parser', 'pycoinglass.columnar')
+
+SCRIPT = f"""
+import sys, time, json
+t = time.perf_counter()
+import pycoinglass
+sec = time.perf_counter() - t
+print(json.dumps({{'sec': sec, 'loaded': [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+
+def measure():
+    out = subprocess.run([sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout)
+
+
+def main(repeat, budget):
+    results = [measure() for _ in range(repeat)]
+    secs = [r['sec'] for r in results]
+    loaded = sorted({m for r in results for m in r['loaded']})
+    median = statistics.median(secs)
+    print(f"import pycoinglass: median {median * 1000:.1f} ms, min {min(secs) * 1000:.1f} ms ({repeat} runs)")
+    print(f"heavy modules loaded: {loaded or 'none'}")
+
+    ok = len(loaded) == 0
+    if budget is not None and median > budget:
+        print(f"over budget: {median * 1000:.1f} ms > {budget * 1000:.1f} ms")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=0.3, help="seconds")
+    args = parser.parse_args()
+    sys.exit(main(args.repeat, args.budget))
@@ -0,0 +1,54 @@
+""" DataParser.liquidation_chart のマイクロベンチマーク (時間足ごとにDataFrameを作っていた旧実装との比較)。
+
+python benchmark/liquidation_chart.py
+"""
+import timeit
+import random
+
+import pandas as pd
+
+from pycoinglass import DataParser, LiquidationChart, to_datetime
+from pycoinglass.server import liquidation_chart_payload
+
+
+def legacy_liquidation_chart(data):
+    data_all, data_list = [], {}
+    timestamps = to_datetime([item['createTime'] for item in data])
+    for item, ts in zip(data, timestamps):
+        new_item = {}
+        for k, v in item.items():
+            if k == 'list':
+                data_list[ts] = pd.DataFrame(v).set_index("exchangeName")
+                continue
+            if k == 'createTime':
+                k = 'timestamp'
+                v = ts
+            new_item[k] = v
+        data_all.append(new_item)
+    df = pd.DataFrame(data_all).set_index('timestamp').sort_index()
+    df_by_exchange = pd.concat(data_list)
+    df_by_exchange.index.names = ['timestamp', 'exchange']
+    return LiquidationChart(df, df_by_exchange)
+
+
+def main(sizes, number):
+    random.seed(0)
+    print(f"{'buckets':>8s} {'legacy':>12s} {'current':>12s} {'speedup':>8s}")
+    for size in sizes:
+        payload = liquidation_chart_payload(size)
+        expected, actual = legacy_liquidation_chart(payload), DataParser.liquidation_chart(payload)
+        pd.testing.assert_frame_equal(expected.total, actual.total)
+        pd.testing.assert_frame_equal(expected.exchange, actual.exchange)
+
+        legacy = min(timeit.repeat(lambda: legacy_liquidation_chart(payload), number=number, repeat=3)) / number
+        current = min(timeit.repeat(lambda: DataParser.liquidation_chart(payload), number=number, repeat=3)) / number
+        print(f"{size:8d} {legacy * 1000:9.2f} ms {current * 1000:9.2f} ms {legacy / current:7.1f}x")
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 1500])
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.number)
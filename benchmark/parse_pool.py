@@ -0,0 +1,75 @@
+""" 複数のレスポンスのdecode+parseのthroughput: thread (GIL)、process (DataFrameをpickle)、`ParsePool` (shared memory)。
+
+python benchmark/parse_pool.py [--size 20000] [--responses 16] [--processes 4]
+"""
+import os
+import json
+import time
+import random
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from pycoinglass import API, Parser, loads
+from pycoinglass.pool import ParsePool
+from pycoinglass.server import PAYLOADS
+
+NAMES = ['liquidation_chart', 'funding_rate_chart']
+
+
+def parse(data_parser, content):
+    return data_parser(API._data(loads(content)))
+
+
+def bodies(size, responses):
+    random.seed(0)
+    payloads = {name: PAYLOADS[name](size) for name in NAMES}
+    return [
+        (Parser(name), json.dumps({'code': "0", 'msg': "success", 'data': payloads[name]}).encode())
+        for name in (NAMES * responses)[:responses]
+    ]
+
+
+def run(fn, jobs):
+    t = time.perf_counter()
+    fn(jobs)
+    return time.perf_counter() - t
+
+
+def main(size, responses, processes):
+    jobs = bodies(size, responses)
+    mb = sum(len(body) for _, body in jobs) / 1e6
+    print(f"{responses} responses, {mb:.0f} MB, {processes} processes")
+
+    def inline(jobs):
+        return [parse(p, body) for p, body in jobs]
+
+    def threads(jobs):
+        with ThreadPoolExecutor(processes) as executor:
+            return list(executor.map(parse, *zip(*jobs)))
+
+    with ProcessPoolExecutor(processes) as executor:
+        list(executor.map(parse, *zip(*jobs[:processes])))  # warm up
+
+        def pickled(jobs):
+            return list(executor.map(parse, *zip(*jobs)))
+
+        with ParsePool(processes, min_bytes=0) as pool, ThreadPoolExecutor(processes) as caller:
+            list(caller.map(pool.parse, *zip(*jobs[:processes])))
+
+            def shared(jobs):
+                return list(caller.map(pool.parse, *zip(*jobs)))
+
+            for name, fn in [('inline', inline), ('threads', threads), ('processes (pickle)', pickled),
+                             ('ParsePool (shared memory)', shared)]:
+                sec = run(fn, jobs)
+                print(f"{name:28s} {sec:7.2f}s {responses / sec:8.1f} responses/s")
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--responses", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count()))
+    args = parser.parse_args()
+    main(args.size, args.responses, args.processes)
@@ -0,0 +1,87 @@
+""" `pycoinglass.server` に対するpollingのend-to-endのベンチマーク (HTTP + 検証 + parse)。
+
+python benchmark/polling.py [--rounds 20] [--latency 0.05] [--throttle-rate 0.01] [--async]
+"""
+import time
+import asyncio
+
+import numpy as np
+
+from pycoinglass import API, AsyncAPI, Request
+from pycoinglass.replay import redirect
+from pycoinglass.server import StandInServer
+
+SYMBOLS = ["BTC", "ETH", "XRP", "LTC"]
+
+
+def requests_(symbols):
+    reqs = []
+    for s in symbols:
+        reqs += [
+            Request("exchange_open_interest", s, period="1m"),
+            Request("liquidation_chart", s, period="1m"),
+            Request("long_short_chart", s, period="5m"),
+            Request("funding_rate_chart", s, interval="h8"),
+            Request("margin_market_capture", s),
+            Request("exchange_open_interest_chart_official", s, period="1h"),
+            Request("liquidation_chart_official", s, period="1h"),
+        ]
+    return reqs
+
+
+def report(name, latencies, failures, elapsed):
+    latencies = np.array(latencies) * 1000
+    print(f"{name:6s} {len(latencies) / elapsed:10.1f} rounds/s"
+          f" p50={np.percentile(latencies, 50):8.2f} ms p99={np.percentile(latencies, 99):8.2f} ms"
+          f" failures={failures}")
+
+
+def poll_sync(url, reqs, rounds, concurrency):
+    latencies, failures = [], 0
+    with redirect(API(api_key="dummy", max_concurrency=concurrency, backoff_factor=0.01), url) as api:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            t = time.perf_counter()
+            results = api.fetch_many(reqs)
+            latencies.append(time.perf_counter() - t)
+            failures += sum(isinstance(r, Exception) for r in results.values())
+        report("sync", latencies, failures, time.perf_counter() - start)
+
+
+async def poll_async(url, reqs, rounds, concurrency):
+    latencies, failures = [], 0
+    async with redirect(AsyncAPI(api_key="dummy", max_concurrency=concurrency, backoff_factor=0.01), url) as api:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            t = time.perf_counter()
+            results = await api.fetch_many(reqs)
+            latencies.append(time.perf_counter() - t)
+            failures += sum(isinstance(r, Exception) for r in results.values())
+        report("async", latencies, failures, time.perf_counter() - start)
+
+
+def main(rounds, concurrency, latency, throttle_rate, error_rate, size, fixtures, use_async):
+    reqs = requests_(SYMBOLS)
+    print(f"requests/round={len(reqs)} size={size} latency={latency} throttle={throttle_rate} error={error_rate}")
+    with StandInServer(fixtures, latency=latency, throttle_rate=throttle_rate, error_rate=error_rate,
+                       size=size, seed=0) as server:
+        poll_sync(server.url, reqs, rounds, concurrency)
+        if use_async:
+            asyncio.run(poll_async(server.url, reqs, rounds, concurrency))
+        print(f"server: requests={server.requests} throttled={server.throttled} errors={server.errors}")
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    args = parser.parse_args()
+    main(args.rounds, args.concurrency, args.latency, args.throttle_rate, args.error_rate, args.size, args.fixtures,
+         args.use_async)
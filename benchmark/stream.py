@@ -0,0 +1,48 @@
+""" `loads` と `decode_stream` (stream=True) の時間とピークメモリ (tracemalloc) の比較。
+
+python benchmark/stream.py [--size 200000]
+"""
+import json
+import time
+import random
+import tracemalloc
+
+from pycoinglass import DataParser, loads
+from pycoinglass.stream import decode_stream
+from pycoinglass.server import PAYLOADS
+
+CHUNK_SIZE = 1 << 16
+
+
+def chunks(body):
+    return (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+
+def measure(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    fn()
+    sec = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sec, peak
+
+
+def main(size):
+    random.seed(0)
+    print(f"{'parser':30s} {'MB':>7s} {'loads':>18s} {'stream':>18s}")
+    for name in ['exchange_open_interest', 'funding_rate_chart', 'long_short_chart']:
+        body = json.dumps({'code': "0", 'msg': "success", 'data': PAYLOADS[name](size)}).encode()
+        parser = getattr(DataParser, name)
+        before = measure(lambda: parser(loads(body)['data']))
+        after = measure(lambda: parser(decode_stream(chunks(body))['data']))
+        print(f"{name:30s} {len(body) / 1e6:7.1f}" +
+              "".join(f" {sec:7.2f}s {peak / 1e6:6.0f}MB" for sec, peak in (before, after)))
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.size)
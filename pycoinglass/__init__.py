@@ -1,14 +1,53 @@
 __version__ = '0.1.0'
 
+# coreはpandas/numpy/requestsをimportしない (parse時・session作成時にimportする)
 import os
-import requests
-import numpy as np
-import pandas as pd
-
-from collections import namedtuple
+import json
+import time
+import asyncio
+import threading
+import importlib
+import contextvars
+
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from enum import Enum, auto
 
+from .cache import TTLCache, copy_result
+from .delta import UpdateTracker, is_empty
+from .instrument import current_span
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .ratelimit import RateLimiter, FileRateLimiter, priority
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 初回アクセス時にimportする属性 -> module
+_LAZY = {
+    'DataParser': '.parser',
+    'LiquidationHistoryPages': '.parser',
+    'to_datetime': '.parser',
+    'ColumnarParser': '.columnar',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def loads(content):
+    """ orjsonがあればorjsonでdecodeする。 """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 def fromtimestamp(ts):
     return datetime.fromtimestamp(ts / 1000, timezone.utc)
 
@@ -37,116 +76,66 @@ class Exchange(Enum):
     Bitfinex = auto()
     Phemex = auto()
 
+LiquidationChart = namedtuple('LiquidationChart', ('total', 'exchange'))
+FundingRateChart = namedtuple('FundingRateChart', ('predicted', 'following'))
 
-class DataParser:
-    @staticmethod
-    def margin_market_capture(data):
-        df = pd.DataFrame(data)
-        df['timestamp'] = list(map(fromtimestamp, df['updateTime']))
-        df.sort_values("exchangeName", inplace=True)
-        df.reset_index(inplace=True)
-        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
-        df.rename(columns={"index": "rank"}, inplace=True)
-        return df
 
-    @staticmethod
-    def exchange_open_interest(data):
-        df = pd.DataFrame(data['dataMap'])
-        df['timestamp'] = list(map(fromtimestamp, data['dateList']))
-        df.set_index('timestamp', inplace=True)
-        df.sort_index(inplace=True)
-        df['price'] = data['priceList']
-        return df
+class Parser(namedtuple('Parser', ('name', 'columnar'))):
+    """ `DataParser` (columnar=Trueなら `ColumnarParser`) のメソッドを名前で参照する。
 
-    @staticmethod
-    def exchange_open_interest_chart(data):
-        df = pd.concat([
-            pd.DataFrame(map(fromtimestamp, data['dateList']), columns=['timestamp']),
-            pd.DataFrame(data['priceList'], columns=['price']),
-            pd.DataFrame(data['dataMap']),
-        ], axis=1).set_index('timestamp').sort_index()
-        return df
+    呼び出すまでpandas/numpyをimportしない。
+    """
 
-    @staticmethod
-    def liquidation(data):
-        df = pd.DataFrame(data)
-        df['timestamp'] = list(map(fromtimestamp, df.dateList))
-        df.set_index('timestamp', inplace=True)
-        return df
+    def __new__(cls, name, columnar=False):
+        return super().__new__(cls, name, columnar)
 
-    @staticmethod
-    def liquidation_chart(data):
-        data_all, data_list = [], {}
-        for item in data:
-            new_item = {}
-            for k, v in item.items():
-                if k == 'list':
-                    data_list[fromtimestamp(item['createTime'])] = pd.DataFrame(v).set_index("exchangeName")
-                    continue
-                if k == 'createTime':
-                    k = 'timestamp'
-                    v = fromtimestamp(v)
-                new_item[k] = v
-            data_all.append(new_item)
-        df = pd.DataFrame(data_all).set_index('timestamp').sort_index()
-        df_by_exchange = pd.concat(data_list)
-        df_by_exchange.index.names = ['timestamp', 'exchange']
-
-        LiquidationChart = namedtuple('LiquidationChart', ('total', 'exchange'))
-
-        return LiquidationChart(df, df_by_exchange)
+    def __call__(self, data):
+        if self.columnar:
+            from .columnar import ColumnarParser as parsers
+        else:
+            from .parser import DataParser as parsers
+        return getattr(parsers, self.name)(data)
 
-    @staticmethod
-    def liquidation_history(data):
-        df = pd.DataFrame(data['list'])
-        df.side.replace({1: "BUY", 2: "SELL"}, inplace=True)
-        df['timestamp'] = list(map(fromtimestamp, df.createTime))
-        df['timestamp_turnover'] = list(map(fromtimestamp, df.turnoverTime))
-        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
-        return df
 
-    @staticmethod
-    def funding_rate_chart(data):
-        datelist = list(map(fromtimestamp, data['dateList']))
-        dfs = []
-        # dataMap: predicted
-        # frDataMap: following
-        for k in ['dataMap', 'frDataMap']:
-            df = pd.DataFrame(data[k])
+class Select(namedtuple('Select', ('key', 'parser'))):
+    """ レスポンスの `data[key]` をparserに渡す。 """
 
-            # officialのfunding rate chart apiはfrDataMapが１短い
-            if len(df) == len(data['priceList']):
-                df['price'] = data['priceList']
-            if len(df) == len(datelist):
-                df.index = datelist
-                df.index.name = "timestamp"
+    def __call__(self, data):
+        return self.parser(data[self.key])
 
-            dfs.append(df)
 
-        FundingRateChart = namedtuple('FundingRateCharts', ('predicted', 'following'))
+# dateList/priceList/dataMapのような数値の配列だけのレスポンス (`stream=True` で受信しながらdecodeする)
+STREAM_PARSERS = {
+    Parser('exchange_open_interest'),
+    Parser('exchange_open_interest_chart'),
+    Parser('liquidation'),
+    Parser('funding_rate_chart'),
+    Parser('long_short_chart'),
+    Parser('exchange_vol'),
+}
 
-        return FundingRateChart(*dfs)
 
-    @staticmethod
-    def long_short_chart(data):
-        df = pd.DataFrame(data)
-        df.rename(columns={
-            "dateList": "timestamp",
-            "longRateList": "longRate", "shortsRateList": "shortRate",
-            "longShortRateList": "longShortRate",
-            "priceList": "price",
-        }, inplace=True)
-        df['timestamp'] = list(map(fromtimestamp, df.timestamp))
-        df.set_index("timestamp", inplace=True)
-        df.sort_index(inplace=True)
-        return df
+class Compact(namedtuple('Compact', ('parser',))):
+    """ parserの結果に `DataParser.SCHEMAS` を適用する。 """
+
+    def __call__(self, data):
+        from .parser import DataParser
+
+        schema = DataParser.SCHEMAS.get(self.parser.name)
+        return DataParser.compact(self.parser(data), schema)
 
-    @staticmethod
-    def exchange_vol(data):
-        df = pd.DataFrame(data['dataMap'])
-        df['total'] = data['priceList']
-        df.index = list(map(fromtimestamp, data['dateList']))
-        return df
+
+class Request(namedtuple('Request', ('method', 'args', 'kwargs'))):
+    """ `API.fetch_many` に渡すリクエスト。dictのキーにできるようkwargsはtupleで保持する。
+
+    >>> Request("exchange_open_interest", "BTC", period="1h")
+    """
+
+    def __new__(cls, method, *args, **kwargs):
+        return super().__new__(cls, method, args, tuple(sorted(kwargs.items())))
+
+    def __call__(self, api):
+        return getattr(api, self.method)(*self.args, **dict(self.kwargs))
 
 
 class API:
@@ -159,6 +148,12 @@ class API:
         "24h": 5, "90d": 18
     }
 
+    # キャッシュのTTL計算用 (funding rateのintervalも含む)
+    PERIOD_SECONDS = {
+        "all": 86400, "1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "12h": 43200,
+        "24h": 86400, "90d": 86400, "8h": 28800, "m1": 60, "m5": 300, "h8": 28800,
+    }
+
     # EXCHANGE_OPEN_INTEREST_INTERVAL = {
     #     "all": 0, "1h": 2, "4h": 1, "12h": 4
     # }
@@ -172,12 +167,141 @@ class API:
     #     "all": 0, "1h": 2, "4h": 1, "12h": 4, "24h": 5
     # }
 
-    def __init__(self, api_key=None):
+    # 429/5xxはbackoffしながらリトライする
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    STREAM_CHUNK_SIZE = 1 << 16
+
+    def __init__(self, api_key=None, timeout=10, pool_connections=2, pool_maxsize=10, max_retries=3,
+                 backoff_factor=0.5, http2=False, max_concurrency=None, rate_limiter=None,
+                 cache=None, instrumentation=None, single_flight=True, stream=False, parse_pool=None):
+        """
+
+        :param api_key:
+        :param timeout: seconds (float) or (connect, read) tuple passed to each request
+        :param pool_connections: number of per-host connection pools to keep
+        :param pool_maxsize: max keep-alive connections per host
+        :param max_retries: retries on connection errors and `RETRY_STATUS`
+        :param backoff_factor: exponential backoff factor between retries
+        :param http2: use httpx (`pip install httpx[http2]`) instead of requests to speak HTTP/2
+        :param max_concurrency: max in-flight requests of this instance (default: `pool_maxsize`)
+        :param rate_limiter: `RateLimiter` shared by every method (share it between instances to share a quota)
+        :param cache: `TTLCache` for parsed responses (only used with `return_df=True`)
+        :param instrumentation: `pycoinglass.instrument.Instrumentation` (hooks, timers and exporters)
+        :param single_flight: share one in-flight request (and parsed result) between concurrent identical calls
+        :param stream: decode chart responses (`STREAM_PARSERS`) into numpy arrays while receiving them
+            (requests session only)
+        :param parse_pool: `pycoinglass.pool.ParsePool` to decode and parse large responses in worker processes
+        """
         if api_key is None:
             api_key = os.getenv("COINGLASS_API_KEY")
             assert api_key is not None, "missing `COINGLASS_API_KEY`"
 
+        if stream and http2:
+            raise RuntimeError("`stream=True` is not supported with `http2=True`")
+
         self.api_key = api_key
+        self.timeout = timeout
+        self.stream = stream
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_concurrency = max_concurrency or pool_maxsize
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.parse_pool = parse_pool
+        self.updates = UpdateTracker()
+        self.semaphore = self._init_semaphore()
+        self.single_flight = self._init_single_flight() if single_flight else None
+        self.session = self._init_session(pool_connections, pool_maxsize, max_retries, backoff_factor, http2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def fetch_many(self, reqs, max_workers=None):
+        """ 複数の `Request` をスレッドプールで並列に実行する。
+
+        :param reqs: iterable of `Request`
+        :param max_workers: default: `max_concurrency`
+        :return: dict of `Request` -> result, or the exception the request raised
+
+        >>> reqs = [Request("exchange_open_interest", s, period=p) for s in ["BTC", "ETH"] for p in ["1h", "4h"]]
+        >>> results = api.fetch_many(reqs)
+        """
+        reqs = list(dict.fromkeys(reqs))
+        with ThreadPoolExecutor(max_workers or self.max_concurrency) as executor:
+            futures = {req: executor.submit(contextvars.copy_context().run, req, self) for req in reqs}
+            results = {}
+            for req, future in futures.items():
+                try:
+                    results[req] = future.result()
+                except Exception as e:
+                    results[req] = e
+        return results
+
+    def fetch_updates(self, method, *args, **kwargs):
+        """ 同じ引数での前回の呼び出し以降に追加・更新されたrowだけを返す。
+
+        :param method: name of a method returning a timestamp indexed DataFrame (or a namedtuple of them)
+        :return: same type as `method`, only with new or revised rows
+
+        >>> api.fetch_updates("liquidation_chart", "BTC", period="1m")  # full window
+        >>> api.fetch_updates("liquidation_chart", "BTC", period="1m")  # only new/revised bars
+        """
+        req = Request(method, *args, **kwargs)
+        return self.updates(req, req(self))
+
+    def stream_updates(self, method, *args, interval=60, **kwargs):
+        """ `interval` 秒ごとに `fetch_updates` し、変化があった場合のみyieldするgenerator。 """
+        while True:
+            result = self.fetch_updates(method, *args, **kwargs)
+            if not is_empty(result):
+                yield result
+            time.sleep(interval)
+
+    def iter_liquidation_history(self, symbol=None, side=None, until=None, page_size=100, prefetch=4, headers=None):
+        """ `liquidation_history` を新しいページから順にyieldするgenerator。次の `prefetch` ページを並列に先読みする。
+
+        :param symbol:
+        :param side: 1 = "BUY" 2 = "SELL"
+        :param until: stop at this time (datetime, str or unix time in ms)
+        :param page_size:
+        :param prefetch: number of pages fetched ahead
+        :param headers:
+        :return: DataFrame per page, without rows already yielded
+
+        >>> for df in api.iter_liquidation_history("BTC", until="2022-06-01"):
+        ...     store(df)
+        """
+        from .parser import LiquidationHistoryPages
+
+        pages = LiquidationHistoryPages(until, page_size, prefetch + 1)
+
+        def fetch(page_num):
+            return self.liquidation_history(symbol, side, page_size, page_num, headers, return_df=False)
+
+        with ThreadPoolExecutor(prefetch) as executor:
+            futures = deque(executor.submit(contextvars.copy_context().run, fetch, i) for i in range(1, prefetch + 1))
+            page_num = prefetch + 1
+            try:
+                while futures:
+                    df, done = pages(futures.popleft().result())
+                    if df is not None and len(df) > 0:
+                        yield df
+                    if done:
+                        break
+                    futures.append(executor.submit(contextvars.copy_context().run, fetch, page_num))
+                    page_num += 1
+            finally:
+                for future in futures:
+                    future.cancel()
 
     # official api (https://coinglass.github.io/API-Reference/#general-info)
     # 実際にサイトで叩かれているAPIと違う
@@ -194,16 +318,14 @@ class API:
         assert period in self.PERIODS
         url = f"{API.BASE_URL_FUTURE}/openInterest"
         params = dict(symbol=symbol, interval=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, pd.DataFrame)
+        return self._request(url, params, headers, return_df, Parser('records'), period)
 
     def exchange_open_interest_chart_official(self, symbol, period="all", headers=None, return_df=True):
         assert symbol in Symbol.__members__
         assert period in self.PERIODS
         url = f"{API.BASE_URL_FUTURE}/openInterest/chart"
         params = dict(symbol=symbol, interval=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.exchange_open_interest_chart)
+        return self._request(url, params, headers, return_df, Parser('exchange_open_interest_chart'), period)
 
     def liquidation_official(self, symbol, exchange, headers=None, return_df=True):
         """ https://coinglass.github.io/API-Reference/#liquidation
@@ -218,8 +340,7 @@ class API:
         assert exchange in Exchange.__members__
         url = f"{API.BASE_URL_FUTURE}/liquidation_chart"
         params = dict(symbol=symbol, exName=exchange)
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.liquidation)
+        return self._request(url, params, headers, return_df, Parser('liquidation'))
 
     def liquidation_chart_official(self, symbol, period="all", headers=None, return_df=True):
         """ https://coinglass.github.io/API-Reference/#liquidation-chart
@@ -234,8 +355,7 @@ class API:
         assert period in self.PERIODS
         url = f"{API.BASE_URL_FUTURE}/liquidation/detail/chart"
         params = dict(symbol=symbol, timeType=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.liquidation_chart)
+        return self._request(url, params, headers, return_df, Parser('liquidation_chart'), period)
 
     def long_short_chart_official(self, symbol, period="5m", headers=None, return_df=True):
         """ https://coinglass.github.io/API-Reference/#long-short-chart
@@ -251,8 +371,7 @@ class API:
         assert period not in ["all", "1m"]
         url = f"{API.BASE_URL_FUTURE}/longShort_chart"
         params = dict(symbol=symbol, interval=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.long_short_chart)
+        return self._request(url, params, headers, return_df, Parser('long_short_chart'), period)
 
     def funding_rate_chart_official(self, symbol, interval="8h", t="U", headers=None, return_df=True):
         """ https://coinglass.github.io/API-Reference/#funding-rates-chart
@@ -267,8 +386,7 @@ class API:
         assert symbol in Symbol.__members__
         url = f"{API.BASE_URL_FUTURE}/funding_rates_chart"
         params = dict(symbol=symbol, type=t, interval=self.PERIODS[interval])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.funding_rate_chart)
+        return self._request(url, params, headers, return_df, Parser('funding_rate_chart'), interval)
 
     def exchange_vol_official(self, symbol, headers=None, return_df=True):
         """ https://coinglass.github.io/API-Reference/#exchange-vol
@@ -281,28 +399,27 @@ class API:
         assert symbol in Symbol.__members__
         url = f"{API.BASE_URL_FUTURE}/vol/chart"
         params = dict(symbol=symbol)
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.exchange_vol)
+        return self._request(url, params, headers, return_df, Parser('exchange_vol'))
 
     # TODO
     # def option_open_interest_official(self, symbol, headers=None):
     #     assert symbol in Symbol.__members__
     #     url = f"{API.BASE_URL_OPTION}/openInterest"
     #     params = dict(symbol=symbol)
-    #     return self.__get(url, params.params, headers)
+    #     return self._get(url, params.params, headers)
     #
     # def option_open_interest_chart_official(self, symbol, interval="all", headers=None):
     #     assert symbol in Symbol.__members__
     #     assert interval in self.PERIODS
     #     url = f"{API.BASE_URL_OPTION}/openInterest/history/chart"
     #     params = dict(symbol=symbol, interval=self.PERIODS[interval])
-    #     return self.__get(url, params, headers)
+    #     return self._get(url, params, headers)
     #
     # def option_exchange_vol_official(self, symbol, headers=None):
     #     assert symbol in Symbol.__members__
     #     url = f"{API.BASE_URL_OPTION}/vol/history/chart"
     #     params = dict(symbol=symbol)
-    #     return self.__get(url, params, headers)
+    #     return self._get(url, params, headers)
 
     # Webで叩かれているAPI
     def margin_market_capture(self, symbol, perp_or_future="perp", headers=None, return_df=True):
@@ -323,8 +440,7 @@ class API:
             raise RuntimeError(f"Unsupported: {perp_or_future}")
         url = "https://fapi.coinglass.com/api/futures/v2/marginMarketCap"
         params = dict(symbol=symbol, type=perp_or_future)
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, lambda data: DataParser.margin_market_capture(data[symbol]))
+        return self._request(url, params, headers, return_df, Select(symbol, Parser('margin_market_capture')))
 
     def exchange_open_interest(self, symbol, period="all", currency="USD", headers=None, return_df=True):
         """ https://www.coinglass.com/BitcoinOpenInterest で叩かれているAPI。
@@ -345,8 +461,7 @@ class API:
         assert period in self.PERIODS
         url = f"https://fapi.coinglass.com/api/openInterest/v3/chart"
         params = dict(symbol=symbol, timeType=self.PERIODS[period], currency=currency, type=0)
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.exchange_open_interest)
+        return self._request(url, params, headers, return_df, Parser('exchange_open_interest'), period)
 
     def liquidation_chart(self, symbol, period="1m", headers=None, return_df=True):
         """ https://www.coinglass.com/LiquidationData (Total Liquidations)
@@ -362,8 +477,7 @@ class API:
         assert period in self.PERIODS
         assert period not in ["all"]
         params = dict(symbol=symbol, timeType=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.liquidation_chart)
+        return self._request(url, params, headers, return_df, Parser('liquidation_chart'), period)
 
     def liquidation_history(self, symbol=None, side=None, page_size=100, page_num=1, headers=None, return_df=True):
         """ https://www.coinglass.com/LiquidationData (Historical Liquidations)
@@ -376,16 +490,15 @@ class API:
         :param return_df:
         :return:
         """
-        url = f"https://fapi.coinglass.com/api/futures/liquidation/order?pageSize={page_size}&volUsd=1000&pageNum={page_num}"
-        params = dict()
+        url = "https://fapi.coinglass.com/api/futures/liquidation/order"
+        params = dict(pageSize=page_size, volUsd=1000, pageNum=page_num)
         if symbol:
             params['symbol'] = symbol
         if side:
             if isinstance(side, str):
                 side = 1 if side == "BUY" else 2
             params['side'] = side
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.liquidation_history)
+        return self._request(url, params, headers, return_df, Parser('liquidation_history'))
 
     def long_short_chart(self, symbol, period="5m", headers=None, return_df=True):
         """ https://www.coinglass.com/LongShortRatio (BTC Long/Short Ratio)
@@ -401,8 +514,7 @@ class API:
         assert period not in ["all", "1m"]
         url = "https://fapi.coinglass.com/api/futures/longShortChart"
         params = dict(symbol=symbol, timeType=self.PERIODS[period])
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.long_short_chart)
+        return self._request(url, params, headers, return_df, Parser('long_short_chart'), period)
 
     def funding_rate_chart(self, symbol, t="U", interval="h8", headers=None, return_df=True):
         """ https://www.coinglass.com/pro/fr/BTC
@@ -417,49 +529,357 @@ class API:
         assert interval in ["m1", "m5", "h8"]
         url = "https://fapi.coinglass.com/api/fundingRate/v2/history/chart"
         params = dict(symbol=symbol, type=t, interval=interval)
-        resp = self.__get(url, params, headers)
-        return self.__make_return(resp, return_df, DataParser.funding_rate_chart)
+        return self._request(url, params, headers, return_df, Parser('funding_rate_chart'), interval)
+
+    def _request(self, url, params, headers, return_df, data_parser, period=None):
+        if self.single_flight is None:
+            return self._observe(url, params, headers, return_df, data_parser, period)
+        # 呼び出し元には全員コピーを返す (生のレスポンスはbodyを読み切った上でそのまま共有する)
+        return self.single_flight.do(
+            self._flight_key(url, params, headers, return_df), self._observe,
+            url, params, headers, return_df, data_parser, period, copy=copy_result if return_df else None,
+        )
+
+    def _observe(self, url, params, headers, return_df, data_parser, period=None):
+        if self.instrumentation is None:
+            return self._fetch(url, params, headers, return_df, data_parser, period)
+        span = self.instrumentation.start(url, params)
+        try:
+            result = self._fetch(url, params, headers, return_df, data_parser, period)
+        except Exception as e:
+            self.instrumentation.finish(span, error=e)
+            raise
+        self.instrumentation.finish(span, result)
+        return result
+
+    def _fetch(self, url, params, headers, return_df, data_parser, period=None):
+        if self.cache is None or return_df not in (True, "compact"):
+            resp = self._get(url, params, headers)
+            return self._make_return(resp, return_df, data_parser)
+
+        key = self.cache.key(url, params) + ("" if return_df is True else f"#{return_df}")
+        entry = self.cache.get(key)
+        if entry is not None and not entry.expired:
+            if self.instrumentation is not None:
+                current_span().cached = True
+            return copy_result(entry.value)
+
+        resp = self._get(url, params, self.cache.conditional_headers(entry, headers))
+        ttl = self.cache.ttl(self.PERIOD_SECONDS.get(period))
+        if self.cache.not_modified(entry, resp):
+            return self.cache.revalidate(key, entry, ttl)
+        return self.cache.set(key, self._make_return(resp, return_df, data_parser), ttl, resp.headers)
+
+    def _get(self, url, params, headers):
+        headers = self._init_headers(headers)
+        span = current_span() if self.instrumentation is not None else None
+        # requestsはurllib3の `Retry` が `RETRY_STATUS` をリトライする。httpxは接続エラーしかリトライしない
+        retries = self.max_retries if self.http2 else 0
+        for i in range(retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            with self.semaphore:
+                if span is not None:
+                    span.mark('wait')
+                if self.stream:
+                    # bodyは `_decode` で読む
+                    resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout, stream=True)
+                else:
+                    resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            if span is not None:
+                span.mark_response(resp)
+            if resp.status_code not in self.RETRY_STATUS or i == retries:
+                return resp
+            resp.close()
+            time.sleep(self.backoff_factor * (2 ** i))
 
-    def __get(self, url, params, headers):
-        headers = self.__init_headers(headers)
-        resp = requests.get(url, params=params, headers=headers)
+    def _init_semaphore(self):
+        return threading.BoundedSemaphore(self.max_concurrency)
 
-        return resp
+    def _init_single_flight(self):
+        return SingleFlight()
 
-        if resp.status_code != 200:
-            raise RuntimeError(f"{resp.content}")
-        else:
-            j = resp.json()
-            if j['msg'] != 'success':
-                raise RuntimeError(f"{j}")
-            else:
-                return j['data']
+    @staticmethod
+    def _flight_key(url, params, headers, return_df):
+        return TTLCache.key(url, params), return_df, tuple(sorted(headers.items())) if headers else None
 
-    def __init_headers(self, headers=None):
-        headers = dict(coinglassSecret=self.api_key)
+    @classmethod
+    def _init_session(cls, pool_connections, pool_maxsize, max_retries, backoff_factor, http2):
+        if http2:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("`http2=True` requires httpx (pip install httpx[http2])")
+            limits = httpx.Limits(max_connections=pool_connections * pool_maxsize,
+                                  max_keepalive_connections=pool_maxsize)
+            # 429/5xxは `_get` でリトライする
+            return httpx.Client(transport=httpx.HTTPTransport(http2=True, limits=limits, retries=max_retries))
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=max_retries, backoff_factor=backoff_factor, status_forcelist=cls.RETRY_STATUS,
+            allowed_methods=["GET"], raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _init_headers(self, headers=None):
+        _headers = dict(coinglassSecret=self.api_key)
         if headers is not None:
-            headers.update(headers)
-        return headers
+            _headers.update(headers)
+        return _headers
+
+    def _make_return(self, resp, return_df, data_parser):
+        if not return_df:
+            if self.stream:
+                # single flightで他の呼び出し元と共有するので、streamのbodyを読み切ってから返す
+                resp.content
+            return resp
+        span = current_span() if self.instrumentation is not None else None
+        if self._offload(resp):
+            # decode・検証・parseはworkerで行う
+            result = self.parse_pool.parse(self._resolve_parser(return_df, data_parser), resp.content)
+            if span is not None:
+                span.mark('parse')
+            return result
+        if span is None:
+            data = self._validate(resp, self._decode(resp, data_parser))
+            return self._resolve_parser(return_df, data_parser)(data)
+
+        j = self._decode(resp, data_parser)
+        span.mark('decode')
+        data = self._validate(resp, j)
+        span.mark('validate')
+        result = self._resolve_parser(return_df, data_parser)(data)
+        span.mark('parse')
+        return result
+
+    def _offload(self, resp):
+        return self.parse_pool is not None and resp.status_code == 200 and self.parse_pool.offload(resp.content)
+
+    @staticmethod
+    def _resolve_parser(return_df, data_parser):
+        if return_df == "numpy":
+            if isinstance(data_parser, Select):
+                return Select(data_parser.key, data_parser.parser._replace(columnar=True))
+            return data_parser._replace(columnar=True)
+        elif return_df == "compact":
+            if isinstance(data_parser, Select):
+                return Select(data_parser.key, Compact(data_parser.parser))
+            return Compact(data_parser)
+        return data_parser
 
     @classmethod
-    def __make_return(cls, resp, return_df, data_parser):
-        if return_df:
-            data = cls.__validate_response(resp)
-            return data_parser(data)
-        else:
-            return resp
+    def _validate_response(cls, resp):
+        return cls._validate(resp, cls._decode(resp))
 
     @classmethod
-    def __validate_response(cls, resp):
+    def _decode(cls, resp, data_parser=None):
+        if resp.status_code != 200:
+            return None
+        if data_parser in STREAM_PARSERS and not getattr(resp, '_content_consumed', True):
+            from .stream import decode_stream
+            return decode_stream(resp.iter_content(cls.STREAM_CHUNK_SIZE))
+        return loads(resp.content)
+
+    @classmethod
+    def _validate(cls, resp, j):
         if resp.status_code != 200:
             raise RuntimeError(f"{resp.content}")
         else:
-            j = resp.json()
-            if j['msg'] != 'success':
-                raise RuntimeError(f"{j}")
+            return cls._data(j)
+
+    @staticmethod
+    def _data(j):
+        if j['msg'] != 'success':
+            raise RuntimeError(f"{j}")
+        else:
+            data = j['data']
+            if len(data) == 0:
+                raise RuntimeError(f"Empty data")
             else:
-                data = j['data']
-                if len(data) == 0:
-                    raise RuntimeError(f"Empty data")
-                else:
-                    return data
+                return data
+
+
+class AsyncAPI(API):
+    """ asyncio版のAPI。全エンドポイントのメソッドはcoroutineを返す。
+
+    >>> async with AsyncAPI() as api:
+    ...     chart = await api.liquidation_chart("BTC", "1m")
+    """
+
+    def __init__(self, api_key=None, timeout=10, pool_connections=2, pool_maxsize=10, max_retries=3,
+                 backoff_factor=0.5, http2=False, max_concurrency=None, rate_limiter=None,
+                 cache=None, instrumentation=None, single_flight=True, parse_executor=None, parse_pool=None):
+        """
+
+        :param parse_executor: None (parse in the event loop), True (loop's default executor)
+            or a `concurrent.futures.Executor` to offload `DataParser`
+        :param parse_pool: `pycoinglass.pool.ParsePool` (takes precedence over `parse_executor` for large responses)
+        """
+        self.parse_executor = parse_executor
+        super().__init__(api_key, timeout, pool_connections, pool_maxsize, max_retries, backoff_factor, http2,
+                         max_concurrency, rate_limiter, cache, instrumentation, single_flight,
+                         parse_pool=parse_pool)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        await self.session.aclose()
+
+    async def fetch_many(self, reqs):
+        """ 複数の `Request` を並列に実行する。同時実行数は `max_concurrency` で制限される。
+
+        :param reqs: iterable of `Request`
+        :return: dict of `Request` -> result, or the exception the request raised
+        """
+        reqs = list(dict.fromkeys(reqs))
+        results = await asyncio.gather(*[req(self) for req in reqs], return_exceptions=True)
+        return dict(zip(reqs, results))
+
+    async def fetch_updates(self, method, *args, **kwargs):
+        req = Request(method, *args, **kwargs)
+        return self.updates(req, await req(self))
+
+    async def stream_updates(self, method, *args, interval=60, **kwargs):
+        while True:
+            result = await self.fetch_updates(method, *args, **kwargs)
+            if not is_empty(result):
+                yield result
+            await asyncio.sleep(interval)
+
+    async def iter_liquidation_history(self, symbol=None, side=None, until=None, page_size=100, prefetch=4,
+                                       headers=None):
+        from .parser import LiquidationHistoryPages
+
+        pages = LiquidationHistoryPages(until, page_size, prefetch + 1)
+
+        def fetch(page_num):
+            return asyncio.ensure_future(
+                self.liquidation_history(symbol, side, page_size, page_num, headers, return_df=False)
+            )
+
+        tasks = deque(fetch(i) for i in range(1, prefetch + 1))
+        page_num = prefetch + 1
+        try:
+            while tasks:
+                df, done = pages(await tasks.popleft())
+                if df is not None and len(df) > 0:
+                    yield df
+                if done:
+                    break
+                tasks.append(fetch(page_num))
+                page_num += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, url, params, headers, return_df, data_parser, period=None):
+        if self.single_flight is None:
+            return await self._observe(url, params, headers, return_df, data_parser, period)
+        return await self.single_flight.do(
+            self._flight_key(url, params, headers, return_df), self._observe,
+            url, params, headers, return_df, data_parser, period, copy=copy_result if return_df else None,
+        )
+
+    async def _observe(self, url, params, headers, return_df, data_parser, period=None):
+        if self.instrumentation is None:
+            return await self._fetch(url, params, headers, return_df, data_parser, period)
+        span = self.instrumentation.start(url, params)
+        try:
+            result = await self._fetch(url, params, headers, return_df, data_parser, period)
+        except Exception as e:
+            self.instrumentation.finish(span, error=e)
+            raise
+        self.instrumentation.finish(span, result)
+        return result
+
+    async def _fetch(self, url, params, headers, return_df, data_parser, period=None):
+        data_parser = self._resolve_parser(return_df, data_parser)
+        if self.cache is None or return_df not in (True, "compact"):
+            resp = await self._get(url, params, headers)
+            return await self._parse(resp, data_parser) if return_df else resp
+
+        key = self.cache.key(url, params) + ("" if return_df is True else f"#{return_df}")
+        entry = self.cache.get(key)
+        if entry is not None and not entry.expired:
+            if self.instrumentation is not None:
+                current_span().cached = True
+            return copy_result(entry.value)
+
+        resp = await self._get(url, params, self.cache.conditional_headers(entry, headers))
+        ttl = self.cache.ttl(self.PERIOD_SECONDS.get(period))
+        if self.cache.not_modified(entry, resp):
+            return self.cache.revalidate(key, entry, ttl)
+        return self.cache.set(key, await self._parse(resp, data_parser), ttl, resp.headers)
+
+    async def _parse(self, resp, data_parser):
+        span = current_span() if self.instrumentation is not None else None
+        if self._offload(resp):
+            result = await self.parse_pool.parse_async(data_parser, resp.content)
+            if span is not None:
+                span.mark('parse')
+            return result
+        if span is None:
+            data = self._validate_response(resp)
+        else:
+            j = self._decode(resp)
+            span.mark('decode')
+            data = self._validate(resp, j)
+            span.mark('validate')
+
+        if self.parse_executor is None:
+            result = data_parser(data)
+        else:
+            executor = None if self.parse_executor is True else self.parse_executor
+            result = await asyncio.get_running_loop().run_in_executor(executor, data_parser, data)
+        if span is not None:
+            span.mark('parse')
+        return result
+
+    async def _get(self, url, params, headers):
+        headers = self._init_headers(headers)
+        if self.semaphore is None:
+            # event loopの外で作るとpython3.9では別loopに紐づくため、初回に作る
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        span = current_span() if self.instrumentation is not None else None
+        for i in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            async with self.semaphore:
+                if span is not None:
+                    span.mark('wait')
+                resp = await self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            if span is not None:
+                span.mark_response(resp)
+            if resp.status_code not in self.RETRY_STATUS or i == self.max_retries:
+                return resp
+            await asyncio.sleep(self.backoff_factor * (2 ** i))
+
+    def _init_semaphore(self):
+        return None
+
+    def _init_single_flight(self):
+        return AsyncSingleFlight()
+
+    @classmethod
+    def _init_session(cls, pool_connections, pool_maxsize, max_retries, backoff_factor, http2):
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("AsyncAPI requires httpx (pip install httpx)")
+        limits = httpx.Limits(max_connections=pool_connections * pool_maxsize,
+                              max_keepalive_connections=pool_maxsize)
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=http2, limits=limits, retries=max_retries)
+        )
@@ -0,0 +1,270 @@
+""" `DataParser` の結果に直接使える、逐次更新できるrollingの指標。
+
+直近 `window` 本の個数・合計・二乗和を保持し、新しい足1本ごとにO(1)で更新する (まとめて渡した場合は
+cumsumで一括に計算する)。`update` には毎回の全体の結果でも `API.fetch_updates` の差分でもよく、
+前回までに処理した足は無視し、最新の足 (確定前) の値が変わっていれば置き換えて計算し直す。
+
+>>> z = FundingZScore(window=21)
+>>> z.update(api.funding_rate_chart("BTC"))                    # 全期間
+>>> z.update(api.fetch_updates("funding_rate_chart", "BTC"))   # 新しい足だけ
+"""
+import numpy as np
+import pandas as pd
+
+
+class RollingStats:
+    """ 列ごとの直近 `window` 本の個数 (nanを除く)・合計・二乗和。
+
+    浮動小数の誤差が溜まらないよう、`window` 本ごとにリングバッファから計算し直す。
+    """
+
+    def __init__(self, window, columns=()):
+        self.window = window
+        self.columns = pd.Index(columns)
+        k = len(self.columns)
+        self.values = np.full((window, k), np.nan)  # ring buffer
+        self.count = np.zeros(k)
+        self.sum = np.zeros(k)
+        self.sumsq = np.zeros(k)
+        self._pos = 0
+        self._pushed = 0
+
+    def align(self, columns):
+        """ 新しい列 (取引所) が現れたら追加する。 """
+        columns = columns if isinstance(columns, pd.Index) else pd.Index(columns)
+        new = columns[~columns.isin(self.columns)] if len(self.columns) > 0 else columns
+        if len(new) > 0:
+            self.columns = self.columns.append(new) if len(self.columns) > 0 else new
+            pad = np.zeros(len(new))
+            self.values = np.hstack([self.values, np.full((self.window, len(new)), np.nan)])
+            self.count, self.sum, self.sumsq = (np.concatenate([a, pad]) for a in (self.count, self.sum, self.sumsq))
+        return self.columns
+
+    def history(self):
+        """ 直近 `window - 1` 本 (古い順、足りない分はnan)。 """
+        return np.roll(self.values, -self._pos, axis=0)[1:]
+
+    def last(self, k=0):
+        """ 最新から `k` 本前の値。 """
+        return self.values[(self._pos - 1 - k) % self.window]
+
+    def push(self, x):
+        """ :return: (count, sum, sumsq) including `x` """
+        i = self._pos
+        self._remove(self.values[i])
+        self._add(x)
+        self.values[i] = x
+        self._pos = (i + 1) % self.window
+        self._pushed += 1
+        if self._pushed % self.window == 0:
+            self._rebuild()
+        return self.count.copy(), self.sum.copy(), self.sumsq.copy()
+
+    def replace_last(self, x):
+        i = (self._pos - 1) % self.window
+        self._remove(self.values[i])
+        self._add(x)
+        self.values[i] = x
+        return self.count.copy(), self.sum.copy(), self.sumsq.copy()
+
+    def extend(self, xs):
+        """ 複数の足をまとめて追加する。
+
+        :param xs: (n, columns) array
+        :return: (count, sum, sumsq) for each new row, each (n, columns)
+        """
+        if len(xs) == 1:
+            return tuple(a[None] for a in self.push(xs[0]))
+
+        hist = self.history()
+        ys = np.vstack([hist, xs])
+        valid = ~np.isnan(ys)
+        zs = np.where(valid, ys, 0.0)
+        end = np.arange(len(hist) + 1, len(ys) + 1)
+        start = np.maximum(end - self.window, 0)
+        stats = []
+        for a in (valid.astype(np.float64), zs, zs * zs):
+            cs = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+            stats.append(cs[end] - cs[start])
+
+        tail = ys[-self.window:]
+        self.values = np.full_like(self.values, np.nan)
+        self.values[:len(tail)] = tail
+        self._pos = len(tail) % self.window
+        self._pushed += len(xs)
+        self._rebuild()
+        return tuple(stats)
+
+    def _add(self, x):
+        valid = ~np.isnan(x)
+        self.count += valid
+        self.sum += np.where(valid, x, 0.0)
+        self.sumsq += np.where(valid, x * x, 0.0)
+
+    def _remove(self, x):
+        valid = ~np.isnan(x)
+        self.count -= valid
+        self.sum -= np.where(valid, x, 0.0)
+        self.sumsq -= np.where(valid, x * x, 0.0)
+
+    def _rebuild(self):
+        valid = ~np.isnan(self.values)
+        zs = np.where(valid, self.values, 0.0)
+        self.count = valid.sum(axis=0).astype(np.float64)
+        self.sum = zs.sum(axis=0)
+        self.sumsq = (zs * zs).sum(axis=0)
+
+
+def mean_std(count, total, sumsq, min_periods):
+    """ 標本標準偏差 (ddof=1, pandasのrollingと同じ)。 """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = (sumsq - total * mean) / (count - 1)
+    ok = count >= max(min_periods, 1)
+    return np.where(ok, mean, np.nan), np.where(ok & (count > 1), np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+class Indicator:
+    """ timestamp indexのwideなframeを受け取り、新しい足と最新の足の修正だけを処理する。
+
+    subclassは `frame` (DataParserの結果 -> 数値のDataFrame) と `compute` を実装する。
+    """
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.latest = None
+
+    def frame(self, result):
+        raise NotImplementedError
+
+    def compute(self, index, xs, revise):
+        """ :return: DataFrame for `index` """
+        raise NotImplementedError
+
+    def update(self, result):
+        """
+
+        :param result: `DataParser` output (full window or `fetch_updates` delta)
+        :return: DataFrame of the indicator for new bars (and the latest bar if it was revised)
+        """
+        df = self.frame(result)
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        outs = []
+        if self.latest is not None:
+            revised = df[df.index == self.latest]
+            if len(revised) > 0:
+                outs.append(self.compute(revised.index, revised, revise=True))
+            df = df[df.index > self.latest]
+        if len(df) > 0:
+            outs.append(self.compute(df.index, df, revise=False))
+            self.latest = df.index[-1]
+        if len(outs) == 0:
+            return pd.DataFrame(index=df.index[:0])
+        return pd.concat(outs)
+
+    def _stats(self, stats, xs, revise):
+        stats.align(xs.columns)
+        values = xs.reindex(columns=stats.columns).to_numpy(dtype=np.float64)
+        if revise:
+            return values, tuple(a[None] for a in stats.replace_last(values[-1]))
+        return values, stats.extend(values)
+
+
+class FundingZScore(Indicator):
+    """ 取引所ごとのfunding rateの直近 `window` 本に対するz-score。
+
+    :param field: "predicted" (dataMap) or "following" (frDataMap) of `FundingRateChart`
+    """
+
+    def __init__(self, window=21, min_periods=None, field="predicted"):
+        super().__init__(window, min_periods)
+        self.field = field
+        self.stats = RollingStats(window)
+
+    def frame(self, result):
+        df = getattr(result, self.field) if isinstance(result, tuple) else result
+        return df.drop(columns='price', errors='ignore')
+
+    def compute(self, index, xs, revise):
+        values, (count, total, sumsq) = self._stats(self.stats, xs, revise)
+        mean, std = mean_std(count, total, sumsq, self.min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (values - mean) / std
+        return pd.DataFrame(z, index=index, columns=self.stats.columns)
+
+
+class OIDelta(Indicator):
+    """ 取引所ごと (と合計) のopen interestの `lag` 本前からの変化量と変化率。
+
+    :return: columns (("delta" | "pct"), exchange), including exchange "total"
+    """
+
+    def __init__(self, lag=1):
+        super().__init__(lag + 1, 1)
+        self.lag = lag
+        self.stats = RollingStats(lag + 1)
+
+    def frame(self, result):
+        df = result.drop(columns='price', errors='ignore')
+        return df.assign(total=df.sum(axis=1, min_count=1))
+
+    def compute(self, index, xs, revise):
+        self.stats.align(xs.columns)
+        values = xs.reindex(columns=self.stats.columns).to_numpy(dtype=np.float64)
+        if revise:
+            self.stats.replace_last(values[-1])
+            before = self.stats.last(self.lag)[None]
+        else:
+            before = np.vstack([self.stats.history(), values])[-len(values) - self.lag:-self.lag]
+            self.stats.extend(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = values - before
+            pct = delta / before
+        columns = pd.MultiIndex.from_product([['delta', 'pct'], self.stats.columns])
+        return pd.DataFrame(np.hstack([delta, pct]), index=index, columns=columns)
+
+
+class LiquidationImbalance(Indicator):
+    """ `LiquidationChart.exchange` の直近 `window` 本の (buy - sell) / (buy + sell)。取引所ごとと "total"。 """
+
+    def __init__(self, window=12, min_periods=1):
+        super().__init__(window, min_periods)
+        self.stats = RollingStats(window)
+
+    def frame(self, result):
+        df = result.exchange if isinstance(result, tuple) else result
+        wide = df[['buyVolUsd', 'sellVolUsd']].unstack('exchange')
+        wide.index.name = 'timestamp'
+        return wide
+
+    def compute(self, index, xs, revise):
+        _, (count, total, _) = self._stats(self.stats, xs, revise)
+        sums = pd.DataFrame(np.where(count >= self.min_periods, total, np.nan), index=index,
+                            columns=self.stats.columns)
+        buy, sell = sums['buyVolUsd'], sums['sellVolUsd'].reindex(columns=sums['buyVolUsd'].columns)
+        buy = buy.assign(total=buy.sum(axis=1, min_count=1))
+        sell = sell.assign(total=sell.sum(axis=1, min_count=1))
+        return (buy - sell) / (buy + sell)
+
+
+class LongShortMomentum(Indicator):
+    """ long/short ratioの直近 `window` 本の平均からの乖離 (ratio / mean - 1) とz-score。 """
+
+    def __init__(self, window=12, min_periods=None, column="longShortRate"):
+        super().__init__(window, min_periods)
+        self.column = column
+        self.stats = RollingStats(window)
+
+    def frame(self, result):
+        return result[[self.column]]
+
+    def compute(self, index, xs, revise):
+        values, (count, total, sumsq) = self._stats(self.stats, xs, revise)
+        mean, std = mean_std(count, total, sumsq, self.min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = {
+                self.column: values[:, 0], 'mean': mean[:, 0],
+                'momentum': values[:, 0] / mean[:, 0] - 1, 'zscore': (values[:, 0] - mean[:, 0]) / std[:, 0],
+            }
+        return pd.DataFrame(out, index=index)
@@ -0,0 +1,203 @@
+""" 収集したデータをローカルに貯めて期間指定で読み出すための列指向のarchive。
+
+    directory/<endpoint>/<symbol>/<period>/[<field>/]<YYYY-MM-DD>/<n>.npy
+
+日ごとのパーティションはtimestamp順に並んだ列ごとの `.npy` で、読み出し時はmemmapして
+`np.searchsorted` で範囲を切り出すので、必要なパーティションの必要な範囲しか読まない。
+日時はナノ秒のint64、文字列の列は `<n>.npy` の他に欠損 (None) の位置を `<n>.null.npy` に保存する。
+
+>>> archive = Archive("~/coinglass")
+>>> archive.write("liquidation_chart.BTC.1m", api.liquidation_chart("BTC", "1m"))
+>>> archive.flush()
+>>> archive.read("liquidation_chart", "BTC", "2022-06-01", "2022-06-02", period="1m")
+"""
+import os
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .sink import Sink, to_frames, default_keys
+
+META = "meta.json"
+COLUMNS = "columns.json"
+
+
+def _ns(t):
+    if t is None:
+        return None
+    t = pd.Timestamp(t)
+    t = t.tz_localize('UTC') if t.tz is None else t
+    return t.value
+
+
+def _partition_column(df):
+    """ 日ごとに分ける列: `timestamp`、無ければ最初の日時の列。どちらも無ければNone。 """
+    if 'timestamp' in df.columns:
+        return 'timestamp'
+    return next((c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])), None)
+
+
+def _strings(v):
+    return v.astype(object) if v.dtype.kind == 'U' else v
+
+
+class Archive(Sink):
+    """ `Sink` として書き込み (collectorのsinkにも使える)、`read` で期間を指定して読み出す。
+
+    キー (timestampなどのindex) が同じrowは後から書いたもので上書きされる。
+    パーティションは `timestamp` (無ければ最初の日時の列) で切り、日時の列が無いframeは `write` で拒否する。
+    """
+
+    def __init__(self, directory, batch_size=10000, flush_interval=60.0):
+        super().__init__(batch_size, flush_interval)
+        self.directory = os.path.expanduser(directory)
+
+    def write(self, name, result, keys=None):
+        for table, df in to_frames(name, result):
+            if len(df) > 0 and _partition_column(df.reset_index() if default_keys(df) else df) is None:
+                raise RuntimeError(f"Cannot archive {table}: no timestamp column to partition on")
+        if isinstance(result, tuple) and hasattr(result, '_fields'):
+            self._write_meta(self._path(name), {'type': type(result).__name__, 'fields': list(result._fields)})
+        super().write(name, result, keys)
+
+    def read(self, endpoint, symbol, start=None, end=None, period=None, return_df=True):
+        """ [start, end) のrowを `DataParser` と同じ形で返す。
+
+        :param endpoint: `API` method name
+        :param symbol:
+        :param start: datetime, str or None (from the first row)
+        :param end: datetime, str or None (to the last row)
+        :param period:
+        :param return_df: True (DataFrame) or "numpy" (dict of arrays in the same form as `ColumnarParser`:
+            timestamps in ms, strings as object arrays; numeric columns are memmap views when a single partition)
+        :return:
+        """
+        path = self._path(".".join(x for x in (endpoint, symbol, period) if x is not None))
+        meta = self._read_meta(path)
+        start, end = _ns(start), _ns(end)
+        if 'fields' in meta:
+            from . import LiquidationChart, FundingRateChart
+            cls = {'LiquidationChart': LiquidationChart, 'FundingRateChart': FundingRateChart}[meta['type']]
+            return cls(*[self._read_frame(os.path.join(path, f), start, end, return_df) for f in meta['fields']])
+        return self._read_frame(path, start, end, return_df)
+
+    def _path(self, table):
+        return os.path.join(self.directory, *table.split("."))
+
+    @staticmethod
+    def _write_meta(path, meta):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, META), 'w') as f:
+            json.dump(meta, f)
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(os.path.join(path, META)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RuntimeError(f"Not archived: {path}")
+
+    def _write(self, table, df, keys):
+        path = self._path(table)
+        column = _partition_column(df)
+        datetimes = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+        self._write_meta(path, {'index': self._index.get(table, []), 'keys': keys, 'datetime': datetimes,
+                                'timestamp': column})
+
+        days = pd.DatetimeIndex(df[column]).strftime('%Y-%m-%d')
+        for day, part in df.groupby(days.values):
+            day_path = os.path.join(path, day)
+            if os.path.exists(day_path):
+                old = self._load_partition(day_path, datetimes)
+                part = pd.concat([old, part], ignore_index=True)
+                if keys:
+                    part = part.drop_duplicates(subset=keys, keep='last')
+            self._dump_partition(day_path, part.sort_values(column, kind='stable'))
+
+    @staticmethod
+    def _dump_partition(path, df):
+        tmp, old = path + ".tmp", path + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        columns = []
+        for i, (name, values) in enumerate(df.items()):
+            if pd.api.types.is_datetime64_any_dtype(values):
+                arr = values.values.astype('datetime64[ns]').view(np.int64)
+            elif values.dtype.kind in 'biuf':
+                arr = values.values
+            else:
+                null = values.isna().values
+                if null.any():
+                    np.save(os.path.join(tmp, f"{i}.null.npy"), null)
+                arr = values.where(~null, "").astype(str).values.astype(str)
+            np.save(os.path.join(tmp, f"{i}.npy"), arr)
+            columns.append(name)
+        with open(os.path.join(tmp, COLUMNS), 'w') as f:
+            json.dump(columns, f)
+
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def _load_columns(path, mmap_mode=None):
+        with open(os.path.join(path, COLUMNS)) as f:
+            names = json.load(f)
+        columns = {}
+        for i, name in enumerate(names):
+            arr = np.load(os.path.join(path, f"{i}.npy"), mmap_mode=mmap_mode)
+            null = os.path.join(path, f"{i}.null.npy")
+            if os.path.exists(null):
+                arr = arr.astype(object)
+                arr[np.load(null)] = None
+            columns[name] = arr
+        return columns
+
+    @classmethod
+    def _load_partition(cls, path, datetimes):
+        return cls._to_frame(cls._load_columns(path), datetimes)
+
+    @staticmethod
+    def _to_frame(columns, datetimes):
+        return pd.DataFrame({
+            k: pd.to_datetime(v, utc=True) if k in datetimes else _strings(v)
+            for k, v in columns.items()
+        })
+
+    @staticmethod
+    def _to_numpy(columns, datetimes):
+        # `ColumnarParser` と同じ: 日時はミリ秒
+        return {k: v // 1_000_000 if k in datetimes else _strings(v) for k, v in columns.items()}
+
+    def _read_frame(self, path, start, end, return_df):
+        meta = self._read_meta(path)
+        days = sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d)) and len(d) == 10)
+        if start is not None:
+            days = [d for d in days if d >= pd.Timestamp(start, tz='UTC').strftime('%Y-%m-%d')]
+        if end is not None:
+            days = [d for d in days if d <= pd.Timestamp(end, tz='UTC').strftime('%Y-%m-%d')]
+
+        parts = []
+        for day in days:
+            columns = self._load_columns(os.path.join(path, day), mmap_mode='r')
+            ts = columns[meta.get('timestamp', 'timestamp')]
+            lo = 0 if start is None else np.searchsorted(ts, start, side='left')
+            hi = len(ts) if end is None else np.searchsorted(ts, end, side='left')
+            if hi > lo:
+                parts.append({k: v[lo:hi] for k, v in columns.items()})
+
+        if return_df == "numpy":
+            if len(parts) == 1:
+                return self._to_numpy(parts[0], meta['datetime'])
+            keys = dict.fromkeys(k for p in parts for k in p)
+            return self._to_numpy({k: np.concatenate([p[k] for p in parts if k in p]) for k in keys},
+                                  meta['datetime'])
+
+        if len(parts) == 0:
+            return pd.DataFrame()
+        df = pd.concat([self._to_frame(p, meta['datetime']) for p in parts], ignore_index=True)
+        return df.set_index(meta['index']) if meta['index'] else df
@@ -0,0 +1,171 @@
+import os
+import sys
+import copy
+import time
+import pickle
+import hashlib
+import threading
+
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+def copy_result(value):
+    """ キャッシュした結果を呼び出し側が書き換えても影響しないようにコピーする。 """
+    if hasattr(value, 'copy') and hasattr(value, 'memory_usage'):
+        return value.copy()
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):
+        return type(value)(*map(copy_result, value))
+    else:
+        return copy.deepcopy(value)
+
+
+def sizeof(value):
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):
+        return sum(map(sizeof, value))
+    else:
+        return sys.getsizeof(value)
+
+
+class CacheEntry:
+    __slots__ = ('value', 'expires_at', 'validators', 'size')
+
+    def __init__(self, value, expires_at, validators, size):
+        self.value = value
+        self.expires_at = expires_at
+        self.validators = validators
+        self.size = size
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires_at
+
+
+class TTLCache:
+    """ パース済みのレスポンスをURL+paramsをキーに保持するLRUキャッシュ。
+
+    TTLはperiodの次の足の開始時刻まで (4hのチャートは次の4h足まで再取得しない)。
+    期限切れのエントリはETag/Last-Modifiedがあれば条件付きリクエストで再検証する。
+
+    >>> api = API(cache=TTLCache(maxbytes=64 * 2 ** 20, directory="~/.cache/pycoinglass"))
+    """
+
+    def __init__(self, maxbytes=256 * 2 ** 20, default_ttl=15, max_ttl=None, directory=None):
+        """
+
+        :param maxbytes: upper bound of the in-memory size of cached values
+        :param default_ttl: seconds, used for endpoints without a period
+        :param max_ttl: seconds, caps period derived TTLs
+        :param directory: also persist entries as pickles under this directory
+        """
+        self.maxbytes = maxbytes
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url, params):
+        return url + "?" + urlencode(sorted(params.items()))
+
+    def ttl(self, period_seconds=None):
+        if period_seconds is None:
+            return self.default_ttl
+        now = time.time()
+        ttl = (now // period_seconds + 1) * period_seconds - now
+        if self.max_ttl is not None:
+            ttl = min(ttl, self.max_ttl)
+        return ttl
+
+    def get(self, key):
+        """ 期限切れも含めてエントリを返す (再検証に使うため)。 """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self._put(key, entry)
+        return entry
+
+    def set(self, key, value, ttl, response_headers=None):
+        """ `value` を保存し、呼び出し側に返すためのコピーを返す。 """
+        validators = {}
+        if response_headers is not None:
+            if response_headers.get('ETag'):
+                validators['If-None-Match'] = response_headers['ETag']
+            if response_headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = response_headers['Last-Modified']
+        entry = CacheEntry(value, time.time() + ttl, validators, sizeof(value))
+        self._put(key, entry)
+        self._dump(key, entry)
+        return copy_result(value)
+
+    def revalidate(self, key, entry, ttl):
+        """ 304が返ってきたエントリの期限を延長し、コピーを返す。 """
+        entry.expires_at = time.time() + ttl
+        self._dump(key, entry)
+        return copy_result(entry.value)
+
+    @staticmethod
+    def conditional_headers(entry, headers=None):
+        if entry is None or not entry.validators:
+            return headers
+        return {**(headers or {}), **entry.validators}
+
+    @staticmethod
+    def not_modified(entry, resp):
+        return entry is not None and resp.status_code == 304
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _put(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.size
+            if entry.size > self.maxbytes:
+                return
+            self._entries[key] = entry
+            self.nbytes += entry.size
+            while self.nbytes > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.size
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".pkl")
+
+    def _dump(self, key, entry):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            pickle.dump((entry.value, entry.expires_at, entry.validators), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                value, expires_at, validators = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return CacheEntry(value, expires_at, validators, sizeof(value))
@@ -0,0 +1,211 @@
+""" 複数の (endpoint, symbol, period) を1プロセスで定期的に取得してsinkに保存するcollector。
+
+python -m pycoinglass.collect config.yaml
+
+config (yaml or json):
+
+    api:
+      max_concurrency: 8
+      rate_limit: {rate: 30, per: 60}
+      parse_pool: {processes: 4}   # 省略時はevent loopでparseする
+    sink:
+      type: sqlite            # sqlite / mongo / parquet / archive
+      path: coinglass.db      # sqlite: path, parquet/archive: directory, mongo: uri + db
+    delay: 5                  # 足が確定してから取得するまでの秒数
+    jitter: 2
+    jobs:
+      - endpoint: liquidation_chart
+        symbols: [BTC, ETH]
+        periods: [1m, 5m]
+      - endpoint: margin_market_capture
+        symbols: [BTC]
+        interval: 15
+        keys: [timestamp, exchangeName]   # 省略時は `KEYS`
+        updates: false
+"""
+import json
+import random
+import asyncio
+import inspect
+import logging
+import time
+
+from collections import namedtuple
+
+from . import API, AsyncAPI, RateLimiter, Request
+from .delta import is_empty
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple('Job', ('request', 'table', 'interval', 'keys', 'updates'))
+
+# 名前付きのindexが無い (sinkのキーが決まらない) endpointのキー列。無いと毎回同じrowが追記される
+KEYS = {
+    'exchange_open_interest_official': ['exchangeName', 'symbol', 'updateTime'],
+    'margin_market_capture': ['exchangeName', 'symbol', 'updateTime'],
+    'liquidation_history': ['exchangeName', 'symbol', 'side', 'price', 'volUsd', 'createTime'],
+}
+
+
+def load_config(path):
+    with open(path) as f:
+        text = f.read()
+    try:
+        import yaml
+    except ImportError:
+        return json.loads(text)
+    return yaml.safe_load(text)
+
+
+def make_jobs(config_jobs, default_interval=60):
+    """ configのjobをsymbol/periodごとに展開する。同じリクエストのjobは1つにまとめる (最短のintervalを採用)。
+
+    `keys` を省略したjobは `KEYS` (無ければindexのlevel) をキーにする。
+    """
+    jobs = {}
+    for conf in config_jobs:
+        endpoint = conf['endpoint']
+        params = inspect.signature(getattr(API, endpoint)).parameters
+        period_arg = 'period' if 'period' in params else 'interval' if 'interval' in params else None
+        periods = conf.get('periods', [None]) if period_arg else [None]
+
+        for symbol in conf.get('symbols', [None]):
+            for period in periods:
+                kwargs = dict(conf.get('kwargs', {}))
+                if period is not None:
+                    kwargs[period_arg] = period
+                args = (symbol,) if symbol is not None else ()
+                request = Request(endpoint, *args, **kwargs)
+
+                interval = conf.get('interval') or API.PERIOD_SECONDS.get(period, default_interval)
+                table = ".".join(str(x) for x in (conf.get('name', endpoint), symbol, period) if x is not None)
+                keys = conf.get('keys', KEYS.get(endpoint))
+                job = Job(request, table, interval, keys, conf.get('updates', True))
+
+                if request in jobs:
+                    logger.info(f"Coalesce duplicate job: {request}")
+                    job = job._replace(interval=min(job.interval, jobs[request].interval))
+                jobs[request] = job
+    return list(jobs.values())
+
+
+def make_sink(conf):
+    from . import sink
+
+    conf = dict(conf)
+    kind = conf.pop('type')
+    if kind == 'sqlite':
+        return sink.SQLiteSink(conf.pop('path'), **conf)
+    elif kind == 'parquet':
+        return sink.ParquetSink(conf.pop('directory', conf.pop('path', None)), **conf)
+    elif kind == 'archive':
+        from .archive import Archive
+        return Archive(conf.pop('directory', conf.pop('path', None)), **conf)
+    elif kind == 'mongo':
+        import pymongo
+        client = pymongo.MongoClient(conf.pop('uri', None))
+        return sink.MongoSink(client[conf.pop('db', 'coinglass')], **conf)
+    else:
+        raise RuntimeError(f"Unsupported sink: {kind}")
+
+
+class Collector:
+    """ jobを足の境界 (+ `delay` + jitter) に合わせて実行し、結果をsinkに渡す。
+
+    前回の取得が終わっていないjobはその回をskipし、sinkへの書き込み待ちが `max_pending` を超えると
+    取得側を待たせる (backpressure)。
+    """
+
+    def __init__(self, api, sink, jobs, delay=5.0, jitter=2.0, max_pending=100):
+        self.api = api
+        self.sink = sink
+        self.jobs = jobs
+        self.delay = delay
+        self.jitter = jitter
+        self.queue = asyncio.Queue(max_pending)
+        self.skipped = 0
+        self.errors = 0
+
+    def next_run(self, job, now=None):
+        now = time.time() if now is None else now
+        boundary = (now // job.interval + 1) * job.interval
+        return boundary + self.delay + random.uniform(0, self.jitter)
+
+    async def run(self):
+        writer = asyncio.ensure_future(self._write_loop())
+        try:
+            await asyncio.gather(*[self._job_loop(job) for job in self.jobs])
+        finally:
+            await self.queue.join()
+            writer.cancel()
+            await asyncio.to_thread(self.sink.flush)
+
+    async def _job_loop(self, job):
+        task = None
+        while True:
+            await asyncio.sleep(max(0.0, self.next_run(job) - time.time()))
+            if task is not None and not task.done():
+                self.skipped += 1
+                logger.warning(f"Skip {job.table}: previous fetch is still running")
+                continue
+            task = asyncio.ensure_future(self._fetch(job))
+
+    async def _fetch(self, job):
+        try:
+            if job.updates:
+                result = await self.api.fetch_updates(job.request.method, *job.request.args, **dict(job.request.kwargs))
+            else:
+                result = await job.request(self.api)
+        except Exception:
+            self.errors += 1
+            logger.exception(f"Failed to fetch {job.table}")
+            return
+        if not is_empty(result):
+            await self.queue.put((job, result))
+
+    async def _write_loop(self):
+        while True:
+            job, result = await self.queue.get()
+            try:
+                await asyncio.to_thread(self.sink.write, job.table, result, job.keys)
+            except Exception:
+                logger.exception(f"Failed to write {job.table}")
+            finally:
+                self.queue.task_done()
+
+
+async def run(config):
+    api_conf = dict(config.get('api', {}))
+    rate_limit = api_conf.pop('rate_limit', None)
+    if rate_limit:
+        api_conf['rate_limiter'] = RateLimiter(**rate_limit)
+    pool_conf = api_conf.pop('parse_pool', None)
+    if pool_conf:
+        from .pool import ParsePool
+        api_conf['parse_pool'] = ParsePool(**pool_conf)
+    jobs = make_jobs(config['jobs'], config.get('default_interval', 60))
+    sink = make_sink(config['sink'])
+    logger.info(f"Start collecting {len(jobs)} jobs")
+
+    async with AsyncAPI(**api_conf) as api:
+        try:
+            await Collector(api, sink, jobs, config.get('delay', 5.0), config.get('jitter', 2.0),
+                            config.get('max_pending', 100)).run()
+        finally:
+            await asyncio.to_thread(sink.close)
+            if pool_conf:
+                api_conf['parse_pool'].close()
+
+
+def main(argv=None):
+    from argparse import ArgumentParser
+    parser = ArgumentParser(prog="python -m pycoinglass.collect")
+    parser.add_argument("config")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run(load_config(args.config)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+""" DataFrameを作らずに、レスポンスをnumpyの配列のdict (列指向) に変換するパーサ。
+
+timestampはミリ秒のunix time (int64)、数値はfloat64 (欠損はnan)、文字列はobjectの配列。
+"""
+from operator import itemgetter
+
+import numpy as np
+
+
+TIMESTAMP_KEYS = ('createTime', 'updateTime', 'turnoverTime', 'dateList')
+DROP_KEYS = ('exchangeLogo', 'symbolLogo')
+
+
+def _floats(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _timestamps(values):
+    return np.asarray(values, dtype=np.int64)
+
+
+def _column(key, values):
+    if key in TIMESTAMP_KEYS:
+        return _timestamps(values)
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'iufb':
+        return arr.astype(np.float64)
+    if arr.dtype.kind in 'O' and all(v is None or isinstance(v, (int, float)) for v in values):
+        return _floats(values)
+    return arr.astype(object)
+
+
+def _sort(columns):
+    ts = columns['timestamp']
+    if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind='stable')
+        return {k: v[order] if len(v) == len(ts) else v for k, v in columns.items()}
+    return columns
+
+
+def _chart(data, price_key='price', value_key='dataMap'):
+    columns = {'timestamp': _timestamps(data['dateList']), price_key: _floats(data['priceList'])}
+    columns.update({k: _floats(v) for k, v in data[value_key].items()})
+    return _sort(columns)
+
+
+class ColumnarParser:
+    """ `DataParser` と同じ名前のメソッドで、DataFrameの代わりに列のdictを返す。 """
+
+    @staticmethod
+    def records(data, drop=DROP_KEYS):
+        if len(data) == 0:
+            return {}
+        keys = [k for k in data[0] if k not in drop]
+        try:
+            # 全rowが同じキーを持つ場合はitemgetterで一括に取り出す
+            rows = list(map(itemgetter(*keys, keys[0]), data))
+        except KeyError:
+            keys = [k for k in dict.fromkeys(k for row in data for k in row) if k not in drop]
+            rows = [tuple(row.get(k) for k in keys) for row in data]
+        return {k: _column(k, values) for k, values in zip(keys, zip(*rows))}
+
+    @staticmethod
+    def margin_market_capture(data):
+        return ColumnarParser.records(data)
+
+    @staticmethod
+    def exchange_open_interest(data):
+        return _chart(data)
+
+    @staticmethod
+    def exchange_open_interest_chart(data):
+        return _chart(data)
+
+    @staticmethod
+    def liquidation(data):
+        if isinstance(data, dict):
+            columns = {k: _column(k, v) for k, v in data.items()}
+        else:
+            columns = ColumnarParser.records(data)
+        columns['timestamp'] = columns['dateList']
+        return _sort(columns)
+
+    @staticmethod
+    def liquidation_chart(data):
+        from . import LiquidationChart
+
+        total = ColumnarParser.records(data, drop=DROP_KEYS + ('list',))
+        total['timestamp'] = total.pop('createTime')
+
+        exchange = ColumnarParser.records([row for item in data for row in item['list']])
+        exchange['timestamp'] = np.repeat(total['timestamp'], [len(item['list']) for item in data])
+        exchange['exchange'] = exchange.pop('exchangeName')
+        return LiquidationChart(_sort(total), exchange)
+
+    @staticmethod
+    def liquidation_history(data):
+        columns = ColumnarParser.records(data['list'])
+        columns['timestamp'] = columns['createTime']
+        columns['timestamp_turnover'] = columns['turnoverTime']
+        return columns
+
+    @staticmethod
+    def funding_rate_chart(data):
+        from . import FundingRateChart
+
+        timestamps = _timestamps(data['dateList'])
+        charts = []
+        for k in ['dataMap', 'frDataMap']:
+            columns = {name: _floats(v) for name, v in data[k].items()}
+            size = len(next(iter(columns.values()))) if columns else 0
+            # officialのfunding rate chart apiはfrDataMapが１短い
+            if size == len(data['priceList']):
+                columns['price'] = _floats(data['priceList'])
+            if size == len(timestamps):
+                columns['timestamp'] = timestamps
+                columns = _sort(columns)
+            charts.append(columns)
+        return FundingRateChart(*charts)
+
+    @staticmethod
+    def long_short_chart(data):
+        return _sort({
+            'timestamp': _timestamps(data['dateList']),
+            'longRate': _floats(data['longRateList']),
+            'shortRate': _floats(data['shortsRateList']),
+            'longShortRate': _floats(data['longShortRateList']),
+            'price': _floats(data['priceList']),
+        })
+
+    @staticmethod
+    def exchange_vol(data):
+        return _chart(data, price_key='total')
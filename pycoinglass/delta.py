@@ -0,0 +1,92 @@
+import threading
+
+
+def timestamps(df):
+    """ rowごとのtimestamp (index, MultiIndexのlevel, もしくは列)。無ければNone。 """
+    import pandas as pd
+
+    if 'timestamp' in df.index.names:
+        return pd.DatetimeIndex(df.index.get_level_values('timestamp'))
+    elif isinstance(df.index, pd.DatetimeIndex):
+        return df.index
+    elif 'timestamp' in df.columns:
+        return pd.DatetimeIndex(df['timestamp'])
+    else:
+        return None
+
+
+def _rows(df):
+    """ 比較用に名前付きのindexを列にする。位置だけのindex (RangeIndex等) は並び順で変わるので捨てる。 """
+    import pandas as pd
+
+    if all(n is None for n in df.index.names) and not isinstance(df.index, pd.DatetimeIndex):
+        return df.reset_index(drop=True)
+    return df.reset_index()
+
+
+def is_empty(result):
+    if isinstance(result, tuple):
+        return all(df.empty for df in result)
+    return result.empty
+
+
+class UpdateTracker:
+    """ キーごとに前回返したrowを覚えておき、新しく追加されたrowと値が変わったrowだけを返す。
+
+    前回の末尾 `revisions` 本の足は確定前の可能性があるので、値を比較して更新されていれば返す。
+    namedtupleの結果 (LiquidationChart等) は、いずれかのframeで変化したtimestampのrowを全frameから返す。
+    """
+
+    def __init__(self, revisions=2):
+        self.revisions = revisions
+        self._tails = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key, result):
+        frames = list(result) if isinstance(result, tuple) else [result]
+        with self._lock:
+            changed = [self._changed((key, i), df) for i, df in enumerate(frames)]
+
+        changed_all = [c for c in changed if c is not None]
+        if len(changed_all) == 0:
+            return result
+        union = changed_all[0]
+        for c in changed_all[1:]:
+            union = union.union(c)
+
+        frames = [df if c is None else df[timestamps(df).isin(union)] for df, c in zip(frames, changed)]
+        return type(result)(*frames) if isinstance(result, tuple) else frames[0]
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._tails.clear()
+            else:
+                for k in [k for k in self._tails if k[0] == key]:
+                    del self._tails[k]
+
+    def _changed(self, key, df):
+        ts = timestamps(df)
+        if ts is None:
+            return None
+
+        tail = self._tails.get(key)
+        if tail is None:
+            changed = ts.unique()
+        else:
+            prev_ts = timestamps(tail)
+            new = ts > prev_ts.max()
+            changed = ts[new].unique()
+
+            overlap = ts.isin(prev_ts) & ~new
+            if overlap.any():
+                cur = _rows(df[overlap])
+                old = _rows(tail).drop_duplicates()
+                merged = cur.merge(old, how='left', indicator=True)
+                revised = (merged['_merge'] == 'left_only').values
+                changed = changed.union(ts[overlap][revised].unique())
+
+        unique = ts.unique().sort_values()
+        if len(unique) > 0:
+            self._tails[key] = df[ts >= unique[-min(self.revisions, len(unique))]]
+        return changed
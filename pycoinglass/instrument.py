@@ -0,0 +1,235 @@
+""" リクエストごとの計測 (待ち時間・通信・JSONのdecode・検証・parse、bytes、行数) とそのexport。
+
+>>> stats = Stats()
+>>> api = API(instrumentation=Instrumentation(stats, PrometheusExporter()))
+>>> api.liquidation_chart("BTC", "1m")
+>>> stats.summary()
+
+hookは `before_request(span)` / `after_request(span)` の一方もしくは両方を持つ任意のobject。
+`instrumentation=None` (default) の場合は何もしない。
+"""
+import time
+import threading
+import contextvars
+
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+# wait: rate limiter/semaphore, connect: レスポンスのheaderまで (DNS/connect/TLS/server), transfer: bodyの受信
+PHASES = ('wait', 'connect', 'transfer', 'decode', 'validate', 'parse')
+
+_current = contextvars.ContextVar("pycoinglass_span", default=None)
+
+
+def current_span():
+    return _current.get()
+
+
+def count_rows(result):
+    if isinstance(result, tuple):
+        return sum(count_rows(r) for r in result)
+    elif isinstance(result, dict):
+        return max((len(v) for v in result.values()), default=0)
+    elif hasattr(result, 'status_code'):  # return_df=False
+        return None
+    return len(result)
+
+
+class Span:
+    """ 1回の `API` のメソッド呼び出しの計測値。phaseの時間は `mark` の間隔で測る。 """
+
+    __slots__ = ('endpoint', 'url', 'params', 'start', 'end', 'timings', 'status_code', 'bytes', 'rows',
+                 'attempts', 'cached', 'error', 'context', '_last', '_token')
+
+    def __init__(self, url, params):
+        self.endpoint = urlsplit(url).path
+        self.url = url
+        self.params = params
+        self.start = time.time()
+        self.end = None
+        self.timings = {}
+        self.status_code = None
+        self.bytes = 0
+        self.rows = None
+        self.attempts = 0
+        self.cached = False
+        self.error = None
+        self.context = {}  # exporterが自由に使う
+        self._last = time.perf_counter()
+        self._token = None
+
+    @property
+    def duration(self):
+        return sum(self.timings.values())
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def mark_response(self, resp):
+        """ `resp.elapsed` (headerを受け取るまで) でconnectとtransferを分ける。
+
+        `stream=True` の場合、bodyの受信はdecodeに含まれる。
+        """
+        now = time.perf_counter()
+        total = now - self._last
+        elapsed = getattr(resp, 'elapsed', None)
+        connect = min(elapsed.total_seconds(), total) if elapsed is not None else total
+        self.timings['connect'] = self.timings.get('connect', 0.0) + connect
+        self.timings['transfer'] = self.timings.get('transfer', 0.0) + total - connect
+        self._last = now
+        self.attempts += 1
+        self.status_code = resp.status_code
+        if getattr(resp, '_content_consumed', True):
+            self.bytes += len(resp.content)
+        else:  # stream=True: bodyはまだ読んでいない
+            self.bytes += int(resp.headers.get('Content-Length', 0))
+
+
+class Instrumentation:
+    """ `API(instrumentation=...)` に渡す。hookは登録順に呼ばれ、hookの例外は握りつぶさない。 """
+
+    def __init__(self, *hooks):
+        self.hooks = list(hooks)
+
+    def add(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def start(self, url, params):
+        span = Span(url, params)
+        for hook in self.hooks:
+            if hasattr(hook, 'before_request'):
+                hook.before_request(span)
+        span._token = _current.set(span)
+        span._last = time.perf_counter()
+        return span
+
+    def finish(self, span, result=None, error=None):
+        span.end = time.time()
+        span.error = error
+        if error is None:
+            span.rows = count_rows(result)
+        _current.reset(span._token)
+        for hook in self.hooks:
+            if hasattr(hook, 'after_request'):
+                hook.after_request(span)
+
+
+class Stats:
+    """ endpoint/phaseごとの回数と合計時間をメモリ上で集計するhook。 """
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.cached = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.rows = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def after_request(self, span):
+        with self._lock:
+            self.requests[span.endpoint] += 1
+            self.errors[span.endpoint] += span.error is not None
+            self.cached[span.endpoint] += span.cached
+            self.bytes[span.endpoint] += span.bytes
+            self.rows[span.endpoint] += span.rows or 0
+            for phase, sec in span.timings.items():
+                self.seconds[(span.endpoint, phase)] += sec
+
+    def summary(self):
+        """ :return: DataFrame (index: endpoint) of counts and mean seconds per phase """
+        import pandas as pd
+
+        with self._lock:
+            df = pd.DataFrame({
+                'requests': pd.Series(self.requests, dtype=int), 'errors': pd.Series(self.errors, dtype=int),
+                'cached': pd.Series(self.cached, dtype=int), 'bytes': pd.Series(self.bytes, dtype=int),
+                'rows': pd.Series(self.rows, dtype=int),
+            })
+            for phase in PHASES:
+                df[phase] = pd.Series(
+                    {e: self.seconds.get((e, phase), 0.0) for e in self.requests}, dtype=float
+                ) / df['requests']
+        return df.rename_axis('endpoint')
+
+
+class PrometheusExporter:
+    """ prometheus_clientのCounter/Histogramに書き出すhook (要prometheus_client)。
+
+    >>> prometheus_client.start_http_server(9100)
+    """
+
+    def __init__(self, registry=None, namespace="pycoinglass", buckets=None):
+        try:
+            import prometheus_client as prom
+        except ImportError:
+            raise RuntimeError("PrometheusExporter requires prometheus_client (pip install prometheus_client)")
+
+        kwargs = dict(namespace=namespace)
+        if registry is not None:
+            kwargs['registry'] = registry
+        hist_kwargs = dict(kwargs, buckets=buckets) if buckets is not None else kwargs
+        self.requests = prom.Counter(
+            "requests", "Requests by endpoint and status", ['endpoint', 'status'], **kwargs)
+        self.bytes = prom.Counter("response_bytes", "Response payload bytes", ['endpoint'], **kwargs)
+        self.rows = prom.Counter("rows", "Parsed rows", ['endpoint'], **kwargs)
+        self.duration = prom.Histogram(
+            "request_duration_seconds", "Duration of API calls", ['endpoint'], **hist_kwargs)
+        self.phase = prom.Histogram(
+            "phase_duration_seconds", "Duration of each phase of API calls", ['endpoint', 'phase'], **hist_kwargs)
+
+    def after_request(self, span):
+        if span.cached:
+            status = "cached"
+        elif span.status_code is None:
+            status = "error"
+        else:
+            status = str(span.status_code)
+        self.requests.labels(span.endpoint, status).inc()
+        self.bytes.labels(span.endpoint).inc(span.bytes)
+        if span.rows:
+            self.rows.labels(span.endpoint).inc(span.rows)
+        self.duration.labels(span.endpoint).observe(span.duration)
+        for phase, sec in span.timings.items():
+            self.phase.labels(span.endpoint, phase).observe(sec)
+
+
+class OpenTelemetryExporter:
+    """ 呼び出しごとにspanを作り、各phaseを子spanとして記録するhook (要opentelemetry-api)。 """
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise RuntimeError("OpenTelemetryExporter requires opentelemetry-api (pip install opentelemetry-api)")
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer("pycoinglass")
+
+    def before_request(self, span):
+        span.context['otel'] = self.tracer.start_span(f"GET {span.endpoint}", start_time=time.time_ns())
+
+    def after_request(self, span):
+        otel = span.context.pop('otel')
+        otel.set_attribute("http.url", span.url)
+        if span.status_code is not None:
+            otel.set_attribute("http.status_code", span.status_code)
+        otel.set_attribute("pycoinglass.bytes", span.bytes)
+        otel.set_attribute("pycoinglass.cached", span.cached)
+        if span.rows is not None:
+            otel.set_attribute("pycoinglass.rows", span.rows)
+        if span.error is not None:
+            otel.record_exception(span.error)
+            otel.set_status(self.trace.Status(self.trace.StatusCode.ERROR))
+
+        # phaseは連続しているので開始時刻から順に並べる
+        ctx = self.trace.set_span_in_context(otel)
+        t = int(span.start * 1e9)
+        for phase in PHASES:
+            if phase in span.timings:
+                end = t + int(span.timings[phase] * 1e9)
+                self.tracer.start_span(phase, context=ctx, start_time=t).end(end_time=end)
+                t = end
+        otel.end(end_time=max(t, int(span.end * 1e9)))
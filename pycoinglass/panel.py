@@ -0,0 +1,108 @@
+""" 複数symbolの系列を並列に取得し、共通のUTCの時間軸に揃えたpanelを作る。
+
+>>> df = build_panel(api, ["BTC", "ETH"], period="1h")
+>>> df["BTC"]["open_interest"]
+>>> panel = build_panel(api, ["BTC", "ETH"], period="1h", return_df="numpy")
+>>> panel.values.shape  # (time, symbol, field)
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from collections import namedtuple
+
+from . import API, Request
+
+logger = logging.getLogger(__name__)
+
+# period_arg: periodを渡す引数名 (Noneなら渡さない)
+Field = namedtuple('Field', ('method', 'extract', 'period_arg', 'kwargs'))
+PanelArray = namedtuple('PanelArray', ('values', 'timestamp', 'symbol', 'field'))
+
+FIELDS = {
+    'open_interest': Field(
+        'exchange_open_interest', lambda df: df.drop(columns='price').sum(axis=1, min_count=1), 'period', {}
+    ),
+    'price': Field('exchange_open_interest', lambda df: df['price'], 'period', {}),
+    'funding_rate': Field(
+        'funding_rate_chart', lambda r: r.predicted.drop(columns='price', errors='ignore').mean(axis=1), None,
+        {'interval': 'h8'}
+    ),
+    'long_short_ratio': Field('long_short_chart', lambda df: df['longShortRate'], 'period', {}),
+}
+
+
+def panel_requests(symbols, fields, period):
+    """ (symbol, field) -> Request。同じRequestはfetch_manyで1回だけ取得される。 """
+    reqs = {}
+    for symbol in symbols:
+        for name, field in fields.items():
+            kwargs = dict(field.kwargs)
+            if field.period_arg is not None:
+                kwargs[field.period_arg] = period
+            reqs[(symbol, name)] = Request(field.method, symbol, **kwargs)
+    return reqs
+
+
+def align(series, symbols, fields, grid):
+    """ 各系列をgridの各時刻以前の最新の値 (as-of) で (time, symbol, field) の配列に埋める。 """
+    values = np.full((len(grid), len(symbols), len(fields)), np.nan)
+    grid_ns = grid.asi8
+    for (symbol, name), s in series.items():
+        s = s[~s.index.isna()].sort_index()
+        pos = np.searchsorted(s.index.asi8, grid_ns, side='right') - 1
+        valid = pos >= 0
+        values[valid, symbols.index(symbol), fields.index(name)] = s.values[pos[valid]]
+    return values
+
+
+def make_grid(series, period):
+    starts = [s.index.min() for s in series.values() if len(s) > 0]
+    ends = [s.index.max() for s in series.values() if len(s) > 0]
+    if len(starts) == 0:
+        return pd.DatetimeIndex([], tz='UTC', name='timestamp')
+    freq = f"{API.PERIOD_SECONDS[period]}S"
+    return pd.date_range(min(starts).floor(freq), max(ends), freq=freq, name='timestamp')
+
+
+def build_from_results(results, symbols, fields=None, period="1h", grid=None, return_df=True):
+    fields = FIELDS if fields is None else fields
+    symbols = list(symbols)
+    series = {}
+    for key, req in panel_requests(symbols, fields, period).items():
+        result = results[req]
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to fetch {key}: {result!r}")
+            continue
+        series[key] = fields[key[1]].extract(result)
+
+    grid = make_grid(series, period) if grid is None else grid
+    values = align(series, symbols, list(fields), grid)
+    if return_df == "numpy":
+        return PanelArray(values, grid, symbols, list(fields))
+    columns = pd.MultiIndex.from_product([symbols, list(fields)], names=['symbol', 'field'])
+    return pd.DataFrame(values.reshape(len(grid), -1), index=grid, columns=columns)
+
+
+def build_panel(api, symbols, fields=None, period="1h", grid=None, return_df=True):
+    """
+
+    :param api: `API`
+    :param symbols: list of `Symbol` names
+    :param fields: dict of name -> `Field` (default: `FIELDS`)
+    :param period: grid resolution (a key of `API.PERIODS`)
+    :param grid: DatetimeIndex (UTC) to align to (default: every `period` over the fetched span)
+    :param return_df: True (MultiIndex (symbol, field) columns) or "numpy" (`PanelArray`)
+    :return:
+    """
+    fields = FIELDS if fields is None else fields
+    results = api.fetch_many(panel_requests(symbols, fields, period).values())
+    return build_from_results(results, symbols, fields, period, grid, return_df)
+
+
+async def build_panel_async(api, symbols, fields=None, period="1h", grid=None, return_df=True):
+    """ `AsyncAPI` 版の `build_panel`。 """
+    fields = FIELDS if fields is None else fields
+    results = await api.fetch_many(panel_requests(symbols, fields, period).values())
+    return build_from_results(results, symbols, fields, period, grid, return_df)
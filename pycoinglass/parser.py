@@ -0,0 +1,196 @@
+""" レスポンスをDataFrameにするパーサ (pandas/numpyを使う層)。
+
+`import pycoinglass` ではimportされず、`return_df=True` などでparseする時に初めてimportされる。
+"""
+import numpy as np
+import pandas as pd
+
+from collections import deque
+
+from . import API, Symbol, Exchange, LiquidationChart, FundingRateChart
+
+
+def to_datetime(ts):
+    """ ミリ秒のunix timeの配列を一括でUTCのdatetime64に変換する。 """
+    return pd.to_datetime(ts, unit='ms', utc=True)
+
+
+class DataParser:
+    # return_df="compact" 用のスキーマ: 列 -> カテゴリ (Enumのメンバーを先に並べる。Noneは出現した値のみ)
+    SCHEMAS = {
+        'margin_market_capture': {'exchangeName': Exchange, 'symbol': Symbol},
+        'liquidation_history': {'exchangeName': Exchange, 'symbol': Symbol, 'side': None},
+    }
+
+    @staticmethod
+    def compact(result, schema=None):
+        """ schemaの列をcategoricalに、数値は値が変わらない範囲で小さい型に変換する。 """
+        if isinstance(result, tuple):
+            return type(result)(*[DataParser.compact(df, schema) for df in result])
+
+        df = result.copy()
+        for col, enum in (schema or {}).items():
+            if col in df.columns:
+                observed = df[col].dropna().unique().tolist()
+                categories = list(enum.__members__) if enum is not None else []
+                categories += sorted(set(observed) - set(categories), key=str)
+                df[col] = pd.Categorical(df[col], categories=categories)
+
+        for col in df.columns:
+            values = df[col]
+            if pd.api.types.is_integer_dtype(values.dtype):
+                df[col] = pd.to_numeric(values, downcast='integer')
+            elif pd.api.types.is_float_dtype(values.dtype) and values.dtype != np.float32:
+                as32 = values.values.astype(np.float32)
+                if np.array_equal(as32.astype(values.dtype), values.values, equal_nan=True):
+                    df[col] = as32
+        return df
+
+    @staticmethod
+    def bytes_per_row(result):
+        if isinstance(result, tuple):
+            return sum(DataParser.bytes_per_row(df) for df in result)
+        return result.memory_usage(deep=True).sum() / max(len(result), 1)
+
+    @staticmethod
+    def records(data):
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def margin_market_capture(data):
+        df = pd.DataFrame(data)
+        df['timestamp'] = to_datetime(df['updateTime'])
+        df.sort_values("exchangeName", inplace=True)
+        df.reset_index(inplace=True)
+        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
+        df.rename(columns={"index": "rank"}, inplace=True)
+        return df
+
+    @staticmethod
+    def exchange_open_interest(data):
+        df = pd.DataFrame(data['dataMap'])
+        df['timestamp'] = to_datetime(data['dateList'])
+        df.set_index('timestamp', inplace=True)
+        df.sort_index(inplace=True)
+        df['price'] = data['priceList']
+        return df
+
+    @staticmethod
+    def exchange_open_interest_chart(data):
+        df = pd.concat([
+            pd.DataFrame({'timestamp': to_datetime(data['dateList'])}),
+            pd.DataFrame(data['priceList'], columns=['price']),
+            pd.DataFrame(data['dataMap']),
+        ], axis=1).set_index('timestamp').sort_index()
+        return df
+
+    @staticmethod
+    def liquidation(data):
+        df = pd.DataFrame(data)
+        df['timestamp'] = to_datetime(df.dateList)
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    @staticmethod
+    def liquidation_chart(data):
+        # 時間足ごとにDataFrameを作ってconcatすると遅いので、取引所別のrowを平坦化して一度に作る
+        timestamps = to_datetime([item['createTime'] for item in data])
+        timestamps.name = 'timestamp'
+
+        df = pd.DataFrame(data).drop(columns=['createTime', 'list'])
+        df.index = timestamps
+        df.sort_index(inplace=True)
+
+        rows = [row for item in data for row in item['list']]
+        df_by_exchange = pd.DataFrame(rows)
+        df_by_exchange.index = pd.MultiIndex.from_arrays(
+            [timestamps.repeat([len(item['list']) for item in data]), df_by_exchange.pop('exchangeName')],
+            names=['timestamp', 'exchange'],
+        )
+        return LiquidationChart(df, df_by_exchange)
+
+    @staticmethod
+    def liquidation_history(data):
+        df = pd.DataFrame(data['list'])
+        df.side.replace({1: "BUY", 2: "SELL"}, inplace=True)
+        df['timestamp'] = to_datetime(df.createTime)
+        df['timestamp_turnover'] = to_datetime(df.turnoverTime)
+        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
+        return df
+
+    @staticmethod
+    def funding_rate_chart(data):
+        datelist = to_datetime(data['dateList'])
+        dfs = []
+        # dataMap: predicted
+        # frDataMap: following
+        for k in ['dataMap', 'frDataMap']:
+            df = pd.DataFrame(data[k])
+
+            # officialのfunding rate chart apiはfrDataMapが１短い
+            if len(df) == len(data['priceList']):
+                df['price'] = data['priceList']
+            if len(df) == len(datelist):
+                df.index = datelist
+                df.index.name = "timestamp"
+
+            dfs.append(df)
+        return FundingRateChart(*dfs)
+
+    @staticmethod
+    def long_short_chart(data):
+        df = pd.DataFrame(data)
+        df.rename(columns={
+            "dateList": "timestamp",
+            "longRateList": "longRate", "shortsRateList": "shortRate",
+            "longShortRateList": "longShortRate",
+            "priceList": "price",
+        }, inplace=True)
+        df['timestamp'] = to_datetime(df.timestamp)
+        df.set_index("timestamp", inplace=True)
+        df.sort_index(inplace=True)
+        return df
+
+    @staticmethod
+    def exchange_vol(data):
+        df = pd.DataFrame(data['dataMap'])
+        df['total'] = data['priceList']
+        df.index = to_datetime(data['dateList'])
+        return df
+
+
+class LiquidationHistoryPages:
+    """ liquidation_historyのページを古い方へ辿る際の重複除去と打ち切り判定。
+
+    新しい清算が入るとページがずれて前のページと同じ注文が再び現れるので、直近 `memory` ページ分の
+    rowのhashだけを保持して除去する (メモリは遡る期間によらず一定)。
+    """
+
+    def __init__(self, until=None, page_size=100, memory=4):
+        if until is not None:
+            until = pd.Timestamp(until, unit='ms') if isinstance(until, (int, float)) else pd.Timestamp(until)
+            until = until.tz_localize('UTC') if until.tz is None else until
+        self.until = until
+        self.page_size = page_size
+        self.seen = deque(maxlen=memory)
+
+    def __call__(self, resp):
+        """
+
+        :param resp: response of `API.liquidation_history(..., return_df=False)`
+        :return: (DataFrame of unseen rows or None, whether to stop)
+        """
+        data = API._validate_response(resp)
+        if len(data['list']) == 0:
+            return None, True
+
+        df = DataParser.liquidation_history(data)
+        done = len(data['list']) < self.page_size
+        if self.until is not None:
+            done = done or df.timestamp.min() < self.until
+            df = df[df.timestamp >= self.until]
+
+        hashes = pd.util.hash_pandas_object(df, index=False).values
+        seen = set().union(*self.seen)
+        self.seen.append(set(hashes))
+        return df[~np.isin(hashes, list(seen))], done
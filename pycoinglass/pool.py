@@ -0,0 +1,257 @@
+""" レスポンスのdecodeとparseを別processで実行するpool。結果の配列はshared memoryで受け取る。
+
+`DataParser` (特に `liquidation_chart` や `funding_rate_chart`) はCPUを使い、threadではGILで直列になる。
+`ParsePool` はbody (bytes) をworkerに渡し、workerでdecode・検証・parseした結果の数値の配列を1つの
+shared memoryに書き込んで返す。親processに送られるのはindexのlevelや列名、文字列の配列などの小さな
+部分だけで、DataFrameはpickleしない。HTTPは親processのまま。
+
+>>> with ParsePool(4) as pool:
+...     api = API(parse_pool=pool)
+...     results = api.fetch_many(reqs)
+
+POSIX (Linux/macOS) のみ。
+"""
+import os
+import asyncio
+import multiprocessing
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from . import API, loads
+
+ALIGN = 64
+NUMERIC_KINDS = 'biufcmM'
+
+# shared memory上の配列の位置
+Slot = namedtuple('Slot', ('offset', 'dtype', 'shape'))
+
+
+class Ref(namedtuple('Ref', ('index',))):
+    """ shared memory上の `index` 番目の配列。 """
+
+
+class Frame(namedtuple('Frame', ('index', 'columns', 'values', 'blocks'))):
+    """ DataFrame。dtypeが1つならvaluesは (columns, rows) の配列、そうでなければblocksが列ごとの値。 """
+
+
+class Column(namedtuple('Column', ('kind', 'values', 'meta'))):
+    """ 数値以外のdtypeの列とindex。
+
+    kind: "datetime" (meta: tz, indexなら (tz, name)), "category" (meta: (categories, ordered)),
+    "multi" (values: codes, meta: (levels, names))
+    """
+
+
+class Parts(namedtuple('Parts', ('type', 'items'))):
+    """ tuple/namedtupleの各要素 (typeはpickleで参照として送る)。 """
+
+
+class Packer:
+    """ 結果の中の数値の配列を取り出し、残りの (小さな) 骨組みを返す。 """
+
+    def __init__(self):
+        self.arrays = []
+        self.size = 0
+
+    def pack(self, value):
+        import numpy as np
+        import pandas as pd
+
+        if isinstance(value, np.ndarray):
+            return self.array(value)
+        elif isinstance(value, pd.DataFrame):
+            return self.frame(value)
+        elif isinstance(value, dict):
+            return {k: self.pack(v) for k, v in value.items()}
+        elif isinstance(value, tuple):
+            return Parts(type(value), [self.pack(v) for v in value])
+        return value
+
+    def array(self, arr):
+        if arr.dtype.kind not in NUMERIC_KINDS or arr.size == 0:
+            return arr
+        self.size += -self.size % ALIGN
+        self.arrays.append((Slot(self.size, arr.dtype.str, arr.shape), arr))
+        self.size += arr.nbytes
+        return Ref(len(self.arrays) - 1)
+
+    def frame(self, df):
+        import numpy as np
+
+        dtypes = set(df.dtypes)
+        if len(dtypes) == 1 and isinstance(next(iter(dtypes)), np.dtype):
+            # pandasのblockと同じ (columns, rows) の並びで送る
+            return Frame(self.index(df.index), df.columns, self.array(df.to_numpy().T), None)
+        blocks = [self.column(df.iloc[:, i]) for i in range(df.shape[1])]
+        return Frame(self.index(df.index), df.columns, None, blocks)
+
+    def column(self, s):
+        import pandas as pd
+
+        if isinstance(s.dtype, pd.DatetimeTZDtype):
+            return Column("datetime", self.array(s.values.view('i8')), str(s.dtype.tz))
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            return Column("category", self.array(s.cat.codes.values), (s.cat.categories, s.cat.ordered))
+        return self.pack(s.values)
+
+    def index(self, index):
+        import pandas as pd
+
+        if isinstance(index, pd.DatetimeIndex):
+            tz = None if index.tz is None else str(index.tz)
+            return Column("datetime", self.array(index.asi8), (tz, index.name))
+        elif isinstance(index, pd.MultiIndex):
+            levels = [self.index(level) for level in index.levels]
+            return Column("multi", [self.array(c) for c in index.codes], (levels, list(index.names)))
+        return index
+
+    def write(self):
+        """ :return: (name of the shared memory or None, slots) """
+        import numpy as np
+
+        if len(self.arrays) == 0:
+            return None, []
+        shm = SharedMemory(create=True, size=self.size)
+        try:
+            for slot, arr in self.arrays:
+                np.ndarray(slot.shape, slot.dtype, buffer=shm.buf, offset=slot.offset)[...] = arr
+        finally:
+            shm.close()
+        return shm.name, [slot for slot, _ in self.arrays]
+
+
+def unpack(value, arrays):
+    import pandas as pd
+
+    if isinstance(value, Ref):
+        return arrays[value.index]
+    elif isinstance(value, Frame):
+        index = _unpack_index(value.index, arrays)
+        if value.blocks is None:
+            return pd.DataFrame(unpack(value.values, arrays).T, index=index, columns=value.columns, copy=False)
+        df = pd.DataFrame({i: _unpack_column(b, arrays) for i, b in enumerate(value.blocks)}, index=index)
+        df.columns = value.columns
+        return df
+    elif isinstance(value, dict):
+        return {k: unpack(v, arrays) for k, v in value.items()}
+    elif isinstance(value, Parts):
+        items = [unpack(v, arrays) for v in value.items]
+        return value.type(*items) if hasattr(value.type, '_fields') else value.type(items)
+    return value
+
+
+def _unpack_column(value, arrays):
+    import pandas as pd
+
+    if not isinstance(value, Column):
+        return unpack(value, arrays)
+    elif value.kind == "datetime":
+        return pd.to_datetime(unpack(value.values, arrays), utc=True).tz_convert(value.meta)
+    categories, ordered = value.meta
+    return pd.Categorical.from_codes(unpack(value.values, arrays), categories, ordered)
+
+
+def _unpack_index(value, arrays):
+    import pandas as pd
+
+    if not isinstance(value, Column):
+        return value
+    elif value.kind == "datetime":
+        tz, name = value.meta
+        index = pd.DatetimeIndex(unpack(value.values, arrays).view('M8[ns]'), name=name)
+        return index if tz is None else index.tz_localize('UTC').tz_convert(tz)
+    levels, names = value.meta
+    levels = [_unpack_index(level, arrays) for level in levels]
+    return pd.MultiIndex(levels, [unpack(c, arrays) for c in value.values], names=names, verify_integrity=False)
+
+
+def receive(skeleton, name, slots):
+    """ shared memoryから配列を1回でコピーし、shared memoryを解放して結果を組み立てる。 """
+    import numpy as np
+
+    if name is None:
+        return unpack(skeleton, [])
+    shm = SharedMemory(name=name)
+    try:
+        buf = np.frombuffer(shm.buf, dtype=np.uint8).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    arrays = [np.ndarray(s.shape, s.dtype, buffer=buf, offset=s.offset) for s in slots]
+    return unpack(skeleton, arrays)
+
+
+def work(data_parser, content):
+    """ workerで実行する: decode -> 検証 -> parse -> shared memoryへ書き込み。 """
+    result = data_parser(API._data(loads(content)))
+    packer = Packer()
+    skeleton = packer.pack(result)
+    name, slots = packer.write()
+    return skeleton, name, slots
+
+
+def _release(future):
+    """ 受け取られなかった (cancel/timeout) 結果のshared memoryを解放する。 """
+    if future.cancelled() or future.exception() is not None:
+        return
+    _, name, _ = future.result()
+    if name is not None:
+        try:
+            shm = SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+
+
+def _default_context():
+    # threadが動いているprocess (sinkのtimer、fetch_manyのexecutor等) のforkはdeadlockし得る
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class ParsePool:
+    """ `API(parse_pool=...)` / `AsyncAPI(parse_pool=...)` に渡す。複数のAPIで共有できる。
+
+    :param processes: number of worker processes (default: `os.cpu_count()`)
+    :param min_bytes: responses smaller than this are parsed in the calling thread
+    :param mp_context: `multiprocessing` context (default: forkserver, spawn where it is unavailable)
+    """
+
+    def __init__(self, processes=None, min_bytes=1 << 16, mp_context=None):
+        if os.name != 'posix':
+            raise RuntimeError("ParsePool requires POSIX shared memory")
+        # workerが作ったshared memoryを親processと同じtrackerに登録させる (親が落ちても解放される)
+        resource_tracker.ensure_running()
+        self.processes = processes or os.cpu_count()
+        self.min_bytes = min_bytes
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=mp_context or _default_context())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def offload(self, content):
+        return len(content) >= self.min_bytes
+
+    def parse(self, data_parser, content):
+        """ :return: `data_parser(data)` of the response body `content` """
+        return receive(*self.executor.submit(work, data_parser, content).result())
+
+    async def parse_async(self, data_parser, content):
+        future = self.executor.submit(work, data_parser, content)
+        try:
+            packed = await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            future.add_done_callback(_release)
+            raise
+        return receive(*packed)
@@ -0,0 +1,251 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+RateLimiterMetrics = namedtuple(
+    'RateLimiterMetrics', ('queue_depth', 'acquired', 'throttled', 'wait_time_total', 'wait_time_max')
+)
+
+_priority = contextvars.ContextVar("pycoinglass_priority", default=0)
+
+
+@contextmanager
+def priority(value):
+    """ このブロック内で発行されたリクエストの優先度を設定する。小さいほど優先される (default: 0)。
+
+    >>> with priority(-10):
+    ...     api.liquidation_chart("BTC", "1m")
+    """
+    token = _priority.set(value)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class _AsyncWaiter:
+    """ `acquire_async` の待ち。トークンを渡すときはloopのthreadでfutureを完了させる。 """
+
+    __slots__ = ('loop', 'future', 'timer')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.timer = False
+
+
+class RateLimiter:
+    """ Token bucket. 待ちが発生した場合は優先度順 (同じ優先度ならFIFO) にトークンを渡す。
+
+    threadの `acquire` とasyncioの `acquire_async` は同じ待ち行列に並ぶ。
+
+    >>> limiter = RateLimiter(30, per=60)  # 30 requests / minute
+    >>> api = API(rate_limiter=limiter)
+    """
+
+    def __init__(self, rate, per=60.0, burst=None):
+        """
+
+        :param rate: number of requests allowed per `per` seconds
+        :param per: seconds
+        :param burst: bucket size (default: `rate`)
+        """
+        self.rate = rate / per
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._acquired = 0
+        self._throttled = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def acquire(self, priority=None):
+        """ トークンが取れるまでblockする。
+
+        :param priority: default: `current_priority()`
+        :return: waited seconds
+        """
+        if priority is None:
+            priority = current_priority()
+        start = time.monotonic()
+        with self._cond:
+            entry = (priority, next(self._seq), None)
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == entry:
+                        timeout = self._take()
+                        if timeout == 0:
+                            break
+                    self._cond.wait(timeout)
+            finally:
+                self._remove(entry)
+                self._dispatch()
+            return self._record(start)
+
+    async def acquire_async(self, priority=None):
+        """ `acquire` のasyncio版。threadを使わずにevent loop上で待つ。
+
+        cancelされた場合、既に受け取っていたトークンは返す。
+        """
+        if priority is None:
+            priority = current_priority()
+        start = time.monotonic()
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        with self._cond:
+            entry = (priority, next(self._seq), waiter)
+            heapq.heappush(self._waiters, entry)
+            self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._cond:
+                if entry in self._waiters:
+                    self._remove(entry)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    self._refund()
+                self._dispatch()
+            raise
+        with self._cond:
+            return self._record(start)
+
+    @property
+    def metrics(self):
+        with self._cond:
+            return RateLimiterMetrics(
+                len(self._waiters), self._acquired, self._throttled, self._wait_time_total, self._wait_time_max
+            )
+
+    def _record(self, start):
+        waited = time.monotonic() - start
+        self._acquired += 1
+        if waited > 0.001:
+            self._throttled += 1
+        self._wait_time_total += waited
+        self._wait_time_max = max(self._wait_time_max, waited)
+        return waited
+
+    def _remove(self, entry):
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    def _dispatch(self):
+        """ 先頭の待ちを起こす (lockを持った状態で呼ぶ)。
+
+        先頭がthreadなら `notify_all`、asyncioの待ちならトークンを取って渡し、足りなければ補充される頃に
+        そのloopで再度呼ばれるようにする。
+        """
+        while self._waiters:
+            waiter = self._waiters[0][2]
+            if waiter is None:
+                self._cond.notify_all()
+                return
+            if waiter.future.cancelled() or waiter.loop.is_closed():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._take()
+            if wait > 0:
+                if not waiter.timer:
+                    waiter.timer = True
+                    waiter.loop.call_soon_threadsafe(waiter.loop.call_later, wait, self._retry, waiter)
+                return
+            heapq.heappop(self._waiters)
+            waiter.loop.call_soon_threadsafe(self._grant, waiter)
+
+    def _retry(self, waiter):
+        waiter.timer = False
+        with self._cond:
+            self._dispatch()
+
+    def _grant(self, waiter):
+        if waiter.future.cancelled():
+            # トークンを取った後にcancelされた
+            with self._cond:
+                self._refund()
+                self._dispatch()
+        else:
+            waiter.future.set_result(None)
+
+    def _refund(self):
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+    def _take(self):
+        """ トークンを1つ消費して0を返す。足りなければ補充されるまでの秒数を返す。 """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        else:
+            return (1 - self._tokens) / self.rate
+
+
+class FileRateLimiter(RateLimiter):
+    """ バケットの状態をファイルに置き、同じAPIキーを使う複数プロセスで共有するRateLimiter (POSIX only)。
+
+    優先度は各プロセス内でのみ有効。
+
+    >>> limiter = FileRateLimiter("/tmp/coinglass.bucket", 30, per=60)
+    """
+
+    def __init__(self, path, rate, per=60.0, burst=None):
+        super().__init__(rate, per, burst)
+        self.path = path
+
+    def _take(self):
+        import fcntl
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            content = os.read(fd, 64).split()
+            now = time.time()
+            if len(content) == 2:
+                tokens, updated = float(content[0]), float(content[1])
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            else:
+                tokens = self.capacity
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{tokens} {now}".encode())
+            return wait
+        finally:
+            os.close(fd)
+
+    def _refund(self):
+        import fcntl
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            content = os.read(fd, 64).split()
+            if len(content) == 2:
+                tokens = min(self.capacity, float(content[0]) + 1)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{tokens} {content[1].decode()}".encode())
+        finally:
+            os.close(fd)
@@ -0,0 +1,151 @@
+""" `API._get` の前後に挟んで、実際のレスポンスをディスクに記録・再生する。
+
+>>> api = record(API(), "fixtures")       # 実APIを叩いてfixtures/に保存
+>>> api = replay(API(), "fixtures")       # fixtures/から返す (APIは叩かない)
+>>> api = redirect(API(), server.url)     # `pycoinglass.server` に向ける
+
+fixtureはhostを除いたpathとquery (Noneの値は除く) をキーにするので、`pycoinglass.server` からも同じものを返せる。
+"""
+import os
+import json
+import hashlib
+
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from . import AsyncAPI, loads
+
+
+def fixture_key(url, params=None):
+    query = sorted((k, v) for k, v in (params or {}).items() if v is not None)
+    return urlsplit(url).path + "?" + urlencode(query)
+
+
+def fixture_path(directory, key):
+    return os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+
+
+class Response(namedtuple('Response', ('status_code', 'headers', 'content'))):
+    """ 記録したレスポンス。`_validate_response` が使う属性だけを持つ。 """
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return loads(self.content)
+
+
+def save_fixture(directory, url, params, resp):
+    os.makedirs(directory, exist_ok=True)
+    key = fixture_key(url, params)
+    fixture = {
+        'key': key, 'url': url, 'params': {k: v for k, v in (params or {}).items() if v is not None},
+        'status_code': resp.status_code, 'headers': dict(resp.headers), 'body': resp.content.decode(),
+    }
+    tmp = fixture_path(directory, key) + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(fixture, f)
+    os.replace(tmp, fixture_path(directory, key))
+
+
+def load_fixture(directory, key):
+    """ :return: `Response` or None """
+    try:
+        with open(fixture_path(directory, key)) as f:
+            fixture = json.load(f)
+    except FileNotFoundError:
+        return None
+    return Response(fixture['status_code'], fixture['headers'], fixture['body'].encode())
+
+
+def load_fixtures(directory):
+    """ :return: dict of key -> fixture (dict) """
+    fixtures = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                fixture = json.load(f)
+            fixtures[fixture['key']] = fixture
+    return fixtures
+
+
+def _wrap_get(api, wrapper):
+    """ インスタンスの `_get` を `wrapper(get, url, params, headers)` で置き換える。 """
+    get = api._get
+    if isinstance(api, AsyncAPI):
+        async def _get(url, params, headers):
+            return await wrapper(get, url, params, headers)
+    else:
+        def _get(url, params, headers):
+            return wrapper(get, url, params, headers)
+    api._get = _get
+    return api
+
+
+def record(api, directory, statuses=(200,)):
+    """ レスポンスを返しつつ `directory` に保存する。
+
+    :param statuses: status codes to record (default: only successful responses)
+    """
+    if isinstance(api, AsyncAPI):
+        async def wrapper(get, url, params, headers):
+            resp = await get(url, params, headers)
+            if resp.status_code in statuses:
+                save_fixture(directory, url, params, resp)
+            return resp
+    else:
+        def wrapper(get, url, params, headers):
+            resp = get(url, params, headers)
+            if resp.status_code in statuses:
+                save_fixture(directory, url, params, resp)
+            return resp
+    return _wrap_get(api, wrapper)
+
+
+def replay(api, directory, passthrough=False, statuses=(200,)):
+    """ `directory` のfixtureを返す。
+
+    :param passthrough: request (and record) missing fixtures instead of raising `RuntimeError`
+    :param statuses: status codes to record on passthrough (same as `record`)
+    """
+    def lookup(url, params):
+        resp = load_fixture(directory, fixture_key(url, params))
+        if resp is None and not passthrough:
+            raise RuntimeError(f"No fixture for {fixture_key(url, params)} in {directory}")
+        return resp
+
+    if isinstance(api, AsyncAPI):
+        async def wrapper(get, url, params, headers):
+            resp = lookup(url, params)
+            if resp is None:
+                resp = await get(url, params, headers)
+                if resp.status_code in statuses:
+                    save_fixture(directory, url, params, resp)
+            return resp
+    else:
+        def wrapper(get, url, params, headers):
+            resp = lookup(url, params)
+            if resp is None:
+                resp = get(url, params, headers)
+                if resp.status_code in statuses:
+                    save_fixture(directory, url, params, resp)
+            return resp
+    return _wrap_get(api, wrapper)
+
+
+def redirect(api, base_url):
+    """ 全エンドポイントのhostを `base_url` (e.g. "http://127.0.0.1:8000") に置き換える。 """
+    base_url = base_url.rstrip("/")
+
+    def rewrite(url):
+        parts = urlsplit(url)
+        return base_url + parts.path + ("?" + parts.query if parts.query else "")
+
+    if isinstance(api, AsyncAPI):
+        async def wrapper(get, url, params, headers):
+            return await get(rewrite(url), params, headers)
+    else:
+        def wrapper(get, url, params, headers):
+            return get(rewrite(url), params, headers)
+    return _wrap_get(api, wrapper)
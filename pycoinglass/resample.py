@@ -0,0 +1,171 @@
+""" 細かいperiodの結果から粗いperiod (5m, 15m, ..., 24h) をローカルで計算する。
+
+`API.exchange_open_interest` のdocstringにあるように、5mの系列は1mの系列の各足の先頭の値と一致するので、
+1mだけを取得すれば他の解像度のリクエストを省ける。
+
+>>> charts = fetch_resampled(api, "liquidation_chart", "BTC", ["5m", "15m", "1h"], source="1m")
+"""
+import threading
+
+import pandas as pd
+
+from . import API
+
+# endpointごとの列 -> 集計方法。ここに無い列 (OI/価格/比率などの水準) は足の先頭の値 (`DEFAULT`)、清算量は合計。
+DEFAULT = 'first'
+_LIQUIDATION = {'buyVolUsd': 'sum', 'sellVolUsd': 'sum'}
+RULES = {
+    'liquidation_chart': _LIQUIDATION,
+    'liquidation_chart_official': _LIQUIDATION,
+    'liquidation_official': {'buyList': 'sum', 'sellList': 'sum'},
+}
+
+
+def freq(period):
+    return f"{API.PERIOD_SECONDS[period]}S"
+
+
+def _timestamps(df):
+    return pd.DatetimeIndex(df.index.get_level_values('timestamp') if isinstance(df.index, pd.MultiIndex) else df.index)
+
+
+def rules(method):
+    """ :return: dict of column -> how for `method` (columns not listed use `DEFAULT`) """
+    return RULES.get(method, {})
+
+
+def _apply(grouped, how):
+    if how == 'sum':
+        return grouped.sum(min_count=1)
+    elif isinstance(how, str):
+        return getattr(grouped, how)()
+    else:
+        return grouped.agg(how)
+
+
+def _aggregate(grouped, how, columns):
+    if not isinstance(how, dict):
+        return _apply(grouped, how)
+    # 列ごとに集計方法が違う (水準の列を合計しないように)
+    return pd.concat({c: _apply(grouped[c], how.get(c, DEFAULT)) for c in columns}, axis=1)
+
+
+def _drop_partial(out, first, f):
+    """ 元の足が先頭から揃っていない最初の粗い足を除く。 """
+    if len(out) > 0 and first.floor(f) != first:
+        out = out[_timestamps(out) != first.floor(f)]
+    return out
+
+
+def resample(result, period, how='first', drop_partial=True):
+    """
+
+    :param result: timestamp indexed DataFrame (or namedtuple of them) returned by `API`
+    :param period: target period (a key of `API.PERIOD_SECONDS`)
+    :param how: "first", "last", "sum", "ohlc", ... or dict of column -> how (other columns: `DEFAULT`)
+    :param drop_partial: drop the first bar if the source does not cover it from its start
+    :return: same type as `result`
+    """
+    if isinstance(result, tuple):
+        return type(result)(*[resample(df, period, how, drop_partial) for df in result])
+
+    df = result
+    if len(df) == 0:
+        return df
+    f = freq(period)
+    if isinstance(df.index, pd.MultiIndex):
+        others = [n for n in df.index.names if n != 'timestamp']
+        grouped = df.groupby([pd.Grouper(level='timestamp', freq=f, origin='epoch')] + others)
+    else:
+        grouped = df.resample(f, origin='epoch')
+    out = _aggregate(grouped, how, df.columns).dropna(how='all')
+    if drop_partial:
+        out = _drop_partial(out, _timestamps(df).min(), f)
+    return out
+
+
+def fetch_resampled(api, method, symbol, periods, source="1m", how=None, **kwargs):
+    """ `source` のperiodだけを取得し、`periods` の各解像度を計算する。
+
+    :return: dict of period -> result
+    """
+    how = rules(method) if how is None else how
+    result = getattr(api, method)(symbol, period=source, **kwargs)
+    return {p: result if p == source else resample(result, p, how) for p in periods}
+
+
+async def fetch_resampled_async(api, method, symbol, periods, source="1m", how=None, **kwargs):
+    """ `AsyncAPI` 版の `fetch_resampled`。 """
+    how = rules(method) if how is None else how
+    result = await getattr(api, method)(symbol, period=source, **kwargs)
+    return {p: result if p == source else resample(result, p, how) for p in periods}
+
+
+class Resampler:
+    """ 細かい足を受け取るたびに、影響を受けた粗い足だけを計算し直す。
+
+    粗い足を計算し直すのに必要な分 (最も粗いperiodの直近2本分) だけ細かい足を保持する。
+    `resample` と同じく、最初に受け取った細かい足が先頭から揃っていない粗い足は返さない。
+
+    >>> resampler = Resampler("liquidation_chart", ["5m", "1h"])
+    >>> while True:
+    ...     updated = resampler.update(api.fetch_updates("liquidation_chart", "BTC", period="1m"))
+    ...     updated["1h"]  # bars of the current (and revised) hour
+    """
+
+    def __init__(self, method, periods, how=None):
+        self.periods = list(periods)
+        self.how = rules(method) if how is None else how
+        self._fine = None
+        self._first = None
+        self._lock = threading.Lock()
+
+    def update(self, result):
+        """
+
+        :param result: new or revised fine bars (e.g. from `API.fetch_updates`)
+        :return: dict of period -> re-computed coarse bars touched by `result`
+        """
+        with self._lock:
+            if isinstance(result, tuple):
+                fine = self._fine or [None] * len(result)
+                merged = [self._merge(old, new) for old, new in zip(fine, result)]
+                if self._first is None:
+                    self._first = [self._start(m) for m in merged]
+                out = {p: type(result)(*[self._recompute(m, new, p, first)
+                                         for m, new, first in zip(merged, result, self._first)])
+                       for p in self.periods}
+                self._fine = [self._trim(m) for m in merged]
+            else:
+                merged = self._merge(self._fine, result)
+                if self._first is None:
+                    self._first = self._start(merged)
+                out = {p: self._recompute(merged, result, p, self._first) for p in self.periods}
+                self._fine = self._trim(merged)
+            return out
+
+    @staticmethod
+    def _start(fine):
+        return _timestamps(fine).min() if len(fine) > 0 else None
+
+    @staticmethod
+    def _merge(old, new):
+        if old is None:
+            return new.sort_index()
+        df = pd.concat([old, new])
+        return df[~df.index.duplicated(keep='last')].sort_index()
+
+    def _recompute(self, fine, new, period, first):
+        f = freq(period)
+        touched = _timestamps(new).floor(f).unique()
+        rows = fine[_timestamps(fine).floor(f).isin(touched)]
+        out = resample(rows, period, self.how, drop_partial=False)
+        return out if first is None else _drop_partial(out, first, f)
+
+    def _trim(self, fine):
+        if len(fine) == 0:
+            return fine
+        f = max(self.periods, key=lambda p: API.PERIOD_SECONDS[p])
+        seconds = API.PERIOD_SECONDS[f]
+        start = _timestamps(fine).max().floor(freq(f)) - pd.Timedelta(seconds=seconds)
+        return fine[_timestamps(fine) >= start]
@@ -0,0 +1,286 @@
+""" 負荷試験・ベンチマーク用にcoinglassの代わりをするローカルのHTTPサーバ。
+
+python -m pycoinglass.server [--port 8000] [--fixtures fixtures] [--latency 0.05] [--throttle-rate 0.01]
+
+`pycoinglass.replay.record` で記録したfixtureがあればそれを、無ければ合成データを全エンドポイントで返す。
+合成データの足は現在時刻で終わるので、pollingすると新しい足が増えていく。
+
+>>> with StandInServer(latency=0.05, throttle_rate=0.01) as server:
+...     api = redirect(API(api_key="dummy"), server.url)
+...     api.liquidation_chart("BTC", "1m")
+"""
+import json
+import time
+import random
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from . import API, Exchange
+from .replay import fixture_key, load_fixtures
+
+START = 1650000000000
+EXCHANGES = [e.name for e in Exchange]
+
+
+def dates(size, step=60000, start=START):
+    return [start + i * step for i in range(size)]
+
+
+def floats(size):
+    return [random.random() * 1e6 for _ in range(size)]
+
+
+def chart_payload(size, step=60000, start=START):
+    return {
+        'dateList': dates(size, step, start),
+        'priceList': floats(size),
+        'dataMap': {e: floats(size) for e in EXCHANGES},
+    }
+
+
+def funding_rate_payload(size, step=60000, start=START):
+    return {
+        'dateList': dates(size, step, start),
+        'priceList': floats(size),
+        'dataMap': {e: floats(size) for e in EXCHANGES},
+        'frDataMap': {e: floats(size) for e in EXCHANGES},
+    }
+
+
+def liquidation_chart_payload(size, step=60000, start=START):
+    return [
+        {
+            'createTime': t, 'buyVolUsd': random.random(), 'sellVolUsd': random.random(),
+            'list': [
+                {'exchangeName': e, 'buyVolUsd': random.random(), 'sellVolUsd': random.random()}
+                for e in EXCHANGES
+            ]
+        } for t in dates(size, step, start)
+    ]
+
+
+def liquidation_payload(size, step=60000, start=START):
+    return {'dateList': dates(size, step, start), 'buyList': floats(size), 'sellList': floats(size)}
+
+
+def liquidation_history_payload(size, step=60000, start=START):
+    return {'list': [
+        {
+            'exchangeName': random.choice(EXCHANGES), 'symbol': 'BTC', 'side': random.choice([1, 2]),
+            'price': random.random(), 'volUsd': random.random(), 'createTime': t, 'turnoverTime': t,
+            'exchangeLogo': '', 'symbolLogo': '',
+        } for t in dates(size, step, start)
+    ]}
+
+
+def long_short_payload(size, step=60000, start=START):
+    return {
+        'dateList': dates(size, step, start), 'longRateList': floats(size), 'shortsRateList': floats(size),
+        'longShortRateList': floats(size), 'priceList': floats(size),
+    }
+
+
+def margin_market_capture_payload(size, step=60000, start=START):
+    return [
+        {
+            'exchangeName': random.choice(EXCHANGES), 'symbol': 'BTC', 'openInterest': random.random(),
+            'updateTime': t, 'exchangeLogo': '', 'symbolLogo': '',
+        } for t in dates(size, step, start)
+    ]
+
+
+# DataParserのメソッド名 -> 合成データ
+PAYLOADS = {
+    'margin_market_capture': margin_market_capture_payload,
+    'exchange_open_interest': chart_payload,
+    'exchange_open_interest_chart': chart_payload,
+    'liquidation': liquidation_payload,
+    'liquidation_chart': liquidation_chart_payload,
+    'liquidation_history': liquidation_history_payload,
+    'funding_rate_chart': funding_rate_payload,
+    'long_short_chart': long_short_payload,
+    'exchange_vol': chart_payload,
+}
+
+# path -> DataParserのメソッド名
+ROUTES = {
+    # official
+    "/api/pro/v1/futures/openInterest": 'margin_market_capture',
+    "/api/pro/v1/futures/openInterest/chart": 'exchange_open_interest_chart',
+    "/api/pro/v1/futures/liquidation_chart": 'liquidation',
+    "/api/pro/v1/futures/liquidation/detail/chart": 'liquidation_chart',
+    "/api/pro/v1/futures/longShort_chart": 'long_short_chart',
+    "/api/pro/v1/futures/funding_rates_chart": 'funding_rate_chart',
+    "/api/pro/v1/futures/vol/chart": 'exchange_vol',
+    # web
+    "/api/futures/v2/marginMarketCap": 'margin_market_capture',
+    "/api/openInterest/v3/chart": 'exchange_open_interest',
+    "/api/futures/liquidation/chart": 'liquidation_chart',
+    "/api/futures/liquidation/order": 'liquidation_history',
+    "/api/futures/longShortChart": 'long_short_chart',
+    "/api/fundingRate/v2/history/chart": 'funding_rate_chart',
+}
+
+PERIOD_CODES = {str(code): period for period, code in API.PERIODS.items()}
+
+
+def step_seconds(params):
+    """ timeType/intervalから足の長さを決める。 """
+    for k in ('timeType', 'interval'):
+        if k in params:
+            period = PERIOD_CODES.get(params[k], params[k])
+            return API.PERIOD_SECONDS.get(period, 60)
+    return 60
+
+
+class StandInServer:
+    """
+
+    :param fixtures: directory of fixtures recorded by `pycoinglass.replay.record`
+    :param host:
+    :param port: 0 picks a free port
+    :param latency: seconds added to every response
+    :param jitter: max random seconds added on top of `latency`
+    :param throttle_rate: fraction of requests answered with 429
+    :param error_rate: fraction of requests answered with 500
+    :param size: number of bars of synthetic payloads
+    :param pages: number of non-empty pages of liquidation history
+    """
+
+    def __init__(self, fixtures=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, throttle_rate=0.0,
+                 error_rate=0.0, size=500, pages=10, seed=None):
+        self.fixtures = load_fixtures(fixtures) if fixtures is not None else {}
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.size = size
+        self.pages = pages
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stand_in = self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def respond(self, path, params):
+        """ :return: (status, headers, body) """
+        with self._lock:
+            self.requests += 1
+            r = self.random.random()
+            if r < self.throttle_rate:
+                self.throttled += 1
+                return 429, {'Retry-After': "1"}, b'{"code":"429","msg":"Too Many Requests","success":false}'
+            elif r < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return 500, {}, b'{"code":"500","msg":"Internal Server Error","success":false}'
+
+        key = fixture_key(path, params)
+        if key in self.fixtures:
+            fixture = self.fixtures[key]
+            return fixture['status_code'], {}, fixture['body'].encode()
+        elif path not in ROUTES:
+            return 404, {}, b'{"code":"404","msg":"Not Found","success":false}'
+        return 200, {}, self._synthesize(path, key, params)
+
+    def _synthesize(self, path, key, params):
+        step = step_seconds(params)
+        bar = int(time.time() // step)
+        with self._lock:
+            if (key, bar) in self._bodies:
+                return self._bodies[(key, bar)]
+
+        name = ROUTES[path]
+        size = self.size
+        if name == 'liquidation_history':
+            size = int(params.get('pageSize', 100)) if int(params.get('pageNum', 1)) <= self.pages else 0
+        payload = PAYLOADS[name](size, step * 1000, (bar - size + 1) * step * 1000)
+        if path == "/api/futures/v2/marginMarketCap":
+            payload = {params.get('symbol'): payload}
+        body = json.dumps({'code': "0", 'msg': "success", 'data': payload, 'success': True}).encode()
+
+        with self._lock:
+            if len(self._bodies) > 1024:
+                self._bodies.clear()
+            self._bodies[(key, bar)] = body
+        return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        if stand_in.latency or stand_in.jitter:
+            time.sleep(stand_in.latency + random.uniform(0, stand_in.jitter))
+        parts = urlsplit(self.path)
+        status, headers, body = stand_in.respond(parts.path, dict(parse_qsl(parts.query)))
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    from argparse import ArgumentParser
+    parser = ArgumentParser(prog="python -m pycoinglass.server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    server = StandInServer(args.fixtures, args.host, args.port, args.latency, args.jitter, args.throttle_rate,
+                           args.error_rate, args.size)
+    print(f"Serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+""" 同じリクエストが実行中なら新たに送らず、その結果を待って共有する (single flight)。
+
+共有する結果そのものは誰にも渡さず、最初の呼び出し元も含めて全員に `copy` したものを返すので、
+誰かが結果を書き換えても他には影響しない。
+"""
+import asyncio
+import threading
+
+from .cache import copy_result
+
+
+class _Call:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """ スレッド間で同じキーの呼び出しをまとめる。 """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, fn, *args, copy=copy_result):
+        """
+
+        :param key: hashable key of the call
+        :param fn: called with `args` only by the first caller of `key`
+        :param copy: applied to the shared result for every caller (None: share as is)
+        :return:
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value if copy is None else copy(call.value)
+
+        try:
+            call.value = fn(*args)
+            return call.value if copy is None else copy(call.value)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """ 同じevent loop内で同じキーのcoroutineをまとめる。
+
+    実体は1つのTaskで実行し、各呼び出し元は `asyncio.shield` で待つので、1つの呼び出し元が
+    cancelされても他の呼び出し元の待ちは続く。
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn, *args, copy=copy_result):
+        """ `SingleFlight.do` と同じ。`fn(*args)` はcoroutineを返す。 """
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        value = await asyncio.shield(task)
+        return value if copy is None else copy(value)
@@ -0,0 +1,219 @@
+""" `DataParser` の結果をまとめて保存するsink。
+
+>>> with SQLiteSink("coinglass.db") as sink:
+...     sink.write("liquidation.BTC", api.liquidation_chart("BTC", "1m"))
+"""
+import os
+import time
+import logging
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def to_frames(name, result):
+    """ 結果を (table, DataFrame) のリストにする。namedtupleは `name.field` に分ける。 """
+    if isinstance(result, tuple) and hasattr(result, '_fields'):
+        frames = [(f"{name}.{field}", df) for field, df in zip(result._fields, result)]
+    else:
+        frames = [(name, result)]
+    # exchange_volのindexには名前が無い
+    return [
+        (table, df.rename_axis('timestamp') if isinstance(df.index, pd.DatetimeIndex) and df.index.name is None else df)
+        for table, df in frames
+    ]
+
+
+def default_keys(df):
+    """ 名前付きのindex (timestamp, exchange等) をキーにする。無ければ追記のみ。 """
+    return [k for k in df.index.names if k is not None]
+
+
+class Sink:
+    """ 書き込みをtableごとにbufferし、`batch_size` 行もしくは `flush_interval` 秒ごとにまとめて保存する。
+
+    キー列が同じrowはbuffer内で後勝ちにまとめ、保存先でもupsertするので同じ足を何度書いても重複しない。
+    `flush_interval` はtimer (daemon thread) でも確認するので、`write` が止まってもbufferは残らない。
+    """
+
+    def __init__(self, batch_size=1000, flush_interval=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffers = {}
+        self._keys = {}
+        self._index = {}
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, name, result, keys=None):
+        """
+
+        :param name: table (collection) name
+        :param result: DataFrame or namedtuple of DataFrames returned by `API`
+        :param keys: key columns for upsert (default: named index levels, e.g. ["timestamp"])
+        """
+        with self._lock:
+            for table, df in to_frames(name, result):
+                if len(df) == 0:
+                    continue
+                table_keys = list(keys) if keys is not None else default_keys(df)
+                self._index[table] = default_keys(df)
+                df = df.reset_index() if default_keys(df) else df
+                self._buffers.setdefault(table, []).append(df)
+                self._keys[table] = table_keys
+                self._size += len(df)
+
+            if self._size >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            elif self._size > 0 and self._timer is None:
+                self._schedule()
+
+    def _schedule(self):
+        delay = max(self.flush_interval - (time.monotonic() - self._last_flush), 0)
+        self._timer = threading.Timer(delay, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush")
+            with self._lock:
+                if self._size > 0 and self._timer is None:
+                    self._schedule()
+
+    def flush(self):
+        """ 書き込めたtableだけbufferから消す。`_write` が失敗したtableは残り、次のflushで書き直す。 """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._last_flush = time.monotonic()
+            for table, dfs in list(self._buffers.items()):
+                keys = self._keys[table]
+                df = pd.concat(dfs, ignore_index=True)
+                if keys:
+                    df = df.drop_duplicates(subset=keys, keep='last')
+                self._write(table, df, keys)
+                del self._buffers[table]
+                self._size -= sum(len(d) for d in dfs)
+
+    def close(self):
+        self.flush()
+
+    def _write(self, table, df, keys):
+        raise NotImplementedError
+
+
+class MongoSink(Sink):
+    """ pymongoの `bulk_write` でまとめてupsertする。
+
+    >>> sink = MongoSink(pymongo.MongoClient()["coinglass"])
+    """
+
+    def __init__(self, db, batch_size=1000, flush_interval=5.0):
+        super().__init__(batch_size, flush_interval)
+        self.db = db
+        self._indexed = set()
+
+    def _write(self, table, df, keys):
+        from pymongo import ASCENDING, InsertOne, UpdateOne
+
+        collection = self.db[table]
+        if keys and table not in self._indexed:
+            collection.create_index([(k, ASCENDING) for k in keys], unique=True)
+            self._indexed.add(table)
+
+        records = df.to_dict('records')
+        if keys:
+            ops = [UpdateOne({k: r[k] for k in keys}, {'$set': r}, upsert=True) for r in records]
+        else:
+            ops = [InsertOne(r) for r in records]
+        collection.bulk_write(ops, ordered=False)
+
+
+class SQLiteSink(Sink):
+    """ sqlite3にupsert (INSERT OR REPLACE) する。テストやローカルでの確認用。
+
+    timestampはISO8601の文字列で保存する。
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=5.0):
+        import sqlite3
+
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def close(self):
+        super().close()
+        self.conn.close()
+
+    def read(self, table):
+        return pd.read_sql_query(f'SELECT * FROM "{table}"', self.conn)
+
+    @staticmethod
+    def _sql_type(dtype):
+        if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            return "INTEGER"
+        elif pd.api.types.is_float_dtype(dtype):
+            return "REAL"
+        else:
+            return "TEXT"
+
+    def _write(self, table, df, keys):
+        df = df.copy()
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].map(pd.Timestamp.isoformat)
+
+        columns = {c: self._sql_type(df[c].dtype) for c in df.columns}
+        defs = ", ".join(f'"{c}" {t}' for c, t in columns.items())
+        if keys:
+            defs += ", PRIMARY KEY (" + ", ".join(f'"{k}"' for k in keys) + ")"
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({defs})')
+            existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')}
+            for c, t in columns.items():
+                if c not in existing:
+                    self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}" {t}')
+
+            names = ", ".join(f'"{c}"' for c in df.columns)
+            placeholders = ", ".join("?" * len(df.columns))
+            verb = "INSERT OR REPLACE" if keys else "INSERT"
+            rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            self.conn.executemany(f'{verb} INTO "{table}" ({names}) VALUES ({placeholders})', rows)
+
+
+class ParquetSink(Sink):
+    """ `directory/table/date=YYYY-MM-DD/` に日付でパーティションを切って追記する (要pyarrow)。
+
+    追記のみなので、buffer内で重複を除いた後も同じ足を再度書けばファイル間では重複する。読む側で
+    `drop_duplicates(subset=keys, keep="last")` すること。
+    """
+
+    def __init__(self, directory, batch_size=10000, flush_interval=60.0):
+        super().__init__(batch_size, flush_interval)
+        self.directory = directory
+
+    def _write(self, table, df, keys):
+        if 'timestamp' in df.columns:
+            dates = pd.DatetimeIndex(df['timestamp']).strftime('%Y-%m-%d')
+        else:
+            dates = pd.Index([pd.Timestamp.utcnow().strftime('%Y-%m-%d')] * len(df))
+
+        for date, part in df.groupby(dates.values):
+            path = os.path.join(self.directory, table, f"date={date}")
+            os.makedirs(path, exist_ok=True)
+            part.to_parquet(os.path.join(path, f"part-{time.time_ns()}.parquet"), index=False)
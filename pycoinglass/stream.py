@@ -0,0 +1,166 @@
+""" レスポンスを受信しながらdecodeし、数値の配列 (dateList/priceList/dataMapの各取引所) を直接numpyの配列にする。
+
+`period="all"` のchartは取引所ごとの長い配列を含み、`loads` だとbody (bytes)、Pythonのlist、DataFrameの3つを
+同時に持つことになる。ここではchunkごとに数値を配列に書き込み、それ以外 (code/msgやキー) だけを小さなJSONとして
+残すので、ピーク時のメモリは概ね配列1つ分で済む。
+
+>>> resp = session.get(url, stream=True)
+>>> j = decode_stream(resp.iter_content(1 << 16))
+>>> j['data']['dataMap']['Binance']  # np.ndarray
+
+数値の配列はオブジェクトの値であるもの (`"key": [1, 2, null]`) に限る。整数だけの配列はint64、小数やnullを
+含む配列はfloat64 (nullはnan) になる。
+"""
+import re
+import warnings
+
+import numpy as np
+
+from . import loads
+
+_SPECIAL = re.compile(rb'["\[]')
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+_FLOAT = re.compile(rb'[.eEn]')
+_NUMERIC_START = b'-0123456789n]'
+_PLACEHOLDER = "\x00"
+_WHITESPACE = b' \t\r\n'
+
+
+class _Buffer:
+    """ 足りなくなったら倍に伸ばす配列。長さが分かっていれば `capacity` で確保しておく。 """
+
+    def __init__(self, capacity):
+        self.data = np.empty(max(capacity, 16), dtype=np.int64)
+        self.size = 0
+
+    def append(self, arr):
+        if arr.dtype.kind == 'f' and self.data.dtype.kind != 'f':
+            self.data = self.data.astype(np.float64)
+        n = self.size + len(arr)
+        if n > len(self.data):
+            self.data.resize(max(n, 2 * len(self.data)), refcheck=False)
+        self.data[self.size:n] = arr
+        self.size = n
+
+    def finish(self):
+        self.data.resize(self.size, refcheck=False)
+        return self.data
+
+
+def _parse_numbers(segment):
+    segment = segment.strip(_WHITESPACE)
+    if len(segment) == 0:
+        return np.empty(0, dtype=np.int64)
+    if _FLOAT.search(segment):
+        dtype = np.float64
+        segment = segment.replace(b'null', b'nan')
+    else:
+        dtype = np.int64
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        arr = np.fromstring(segment, dtype=dtype, sep=',')
+    if len(arr) != segment.count(b',') + 1:
+        raise RuntimeError(f"Non-numeric array: {segment[:100]!r}")
+    return arr
+
+
+class StreamDecoder:
+    """ `feed` でchunkを渡し、最後に `close` でdecode結果を受け取る。 """
+
+    def __init__(self):
+        self.skeleton = bytearray()
+        self.arrays = []
+        self.capacity = 0
+        self._tail = b''
+        self._last = b''
+        self._buffer = None
+
+    def feed(self, chunk):
+        buf = self._tail + chunk if self._tail else chunk
+        self._tail = b''
+        i = 0
+        while i < len(buf):
+            if self._buffer is not None:
+                i = self._feed_array(buf, i)
+            else:
+                i = self._feed_skeleton(buf, i)
+                if i is None:
+                    return
+
+    def close(self):
+        if self._buffer is not None or self._tail.strip(_WHITESPACE):
+            raise RuntimeError("Truncated response")
+        return self._resolve(loads(bytes(self.skeleton)))
+
+    def _feed_skeleton(self, buf, i):
+        """ :return: next position, or None when waiting for more bytes """
+        m = _SPECIAL.search(buf, i)
+        end = len(buf) if m is None else m.start()
+        self._copy(buf[i:end])
+        if m is None:
+            return len(buf)
+
+        if buf[end:end + 1] == b'"':
+            s = _STRING.match(buf, end)
+            if s is None:
+                self._tail = buf[end:]
+                return None
+            self._copy(s.group())
+            return s.end()
+
+        # '['
+        j = end + 1
+        while j < len(buf) and buf[j] in _WHITESPACE:
+            j += 1
+        if j == len(buf):
+            self._tail = buf[end:]
+            return None
+        if self._last == b':' and buf[j] in _NUMERIC_START:
+            self._copy(f'"\\u0000{len(self.arrays)}"'.encode())
+            self._buffer = _Buffer(self.capacity)
+            return end + 1
+        self._copy(b'[')
+        return end + 1
+
+    def _feed_array(self, buf, i):
+        close = buf.find(b']', i)
+        if close >= 0:
+            self._buffer.append(_parse_numbers(self._tail + buf[i:close]))
+            self._tail = b''
+            arr = self._buffer.finish()
+            self._buffer = None
+            self.arrays.append(arr)
+            # 同じレスポンスの配列は大抵同じ長さ
+            self.capacity = max(self.capacity, len(arr))
+            return close + 1
+
+        comma = buf.rfind(b',', i)
+        if comma >= 0:
+            self._buffer.append(_parse_numbers(self._tail + buf[i:comma]))
+            self._tail = b''
+            i = comma + 1
+        self._tail += buf[i:]
+        return len(buf)
+
+    def _copy(self, part):
+        self.skeleton += part
+        part = part.rstrip(_WHITESPACE)
+        if part:
+            self._last = part[-1:]
+
+    def _resolve(self, value):
+        if isinstance(value, dict):
+            return {k: self._resolve(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._resolve(v) for v in value]
+        elif isinstance(value, str) and value.startswith(_PLACEHOLDER):
+            return self.arrays[int(value[1:])]
+        return value
+
+
+def decode_stream(chunks):
+    """ bytesのchunkのiterableをdecodeする。 """
+    decoder = StreamDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
@@ -1,42 +1,37 @@
-
 import asyncio
 import pymongo
 import loguru
-from motor import motor_asyncio
-from datetime import datetime
+import pandas as pd
+
+from pycoinglass import AsyncAPI
+from pycoinglass.sink import MongoSink
+
+
+def to_documents(df):
+    """ 1足1document ({timestamp, data: {Total: {...}, <exchange>: {...}}}) の形にする。 """
+    exchanges = {
+        ts: group.droplevel('timestamp').to_dict('index')
+        for ts, group in df.exchange.groupby(level='timestamp')
+    }
+    data = [{'Total': total, **exchanges.get(ts, {})} for ts, total in df.total.to_dict('index').items()]
+    return pd.DataFrame({'data': data}, index=df.total.index)
 
-from pycoinglass import API
 
 async def main(args):
     logger = loguru.logger
     logger.add(args.log, rotation="10MB", retention=3)
 
-    mongo = motor_asyncio.AsyncIOMotorClient()
-    db = mongo[args.db]
-    collection = db[args.collection + "." + args.symbol]
-    collection.create_index([("timestamp", pymongo.ASCENDING)], background=True, unique=True)
+    mongo = pymongo.MongoClient()
+    # timestampをキーにbulk_writeでupsertする (collection: <collection>.<symbol>、documentの形は以前と同じ)
+    sink = MongoSink(mongo[args.db], flush_interval=0)
 
-    api = API(args.api_key)
+    api = AsyncAPI(args.api_key, parse_executor=True)
 
     while True:
-        df = api.liquidation_chart(args.symbol, period="1m")
-
-        d_exchanges = df.exchange.reset_index().groupby('timestamp').apply(lambda x: x.to_dict('records'))
-
-        for d_total, d_exchange in zip(df.total.to_dict('records'), d_exchanges):
-            ts = d_exchange[0]['timestamp']
-            data = {'Total': d_total}
-            for d in d_exchange:
-                d.pop('timestamp')
-                exc = d.pop('exchange')
-                data[exc] = d
-
-            d = {'timestamp': ts, 'data': data}
-            ret = await collection.find_one_and_update(
-                {'timestamp': ts}, {'$set': {'data': data}}, upsert=True
-            )
-            msg = "Register" if d is None else "Update"
-            logger.info(f"{msg} {data}")
+        # 前回から追加・更新された足だけをupsertする
+        df = await api.fetch_updates("liquidation_chart", args.symbol, period="1m")
+        await asyncio.to_thread(sink.write, args.collection + "." + args.symbol, to_documents(df))
+        logger.info(f"Upsert {len(df.total)} bars")
 
         await asyncio.sleep(args.interval)
 
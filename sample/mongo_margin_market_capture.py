@@ -1,28 +1,31 @@
-
 import asyncio
+import pymongo
 import loguru
-from motor import motor_asyncio
 from datetime import datetime
 
-from pycoinglass import API
+from pycoinglass import AsyncAPI
+from pycoinglass.sink import MongoSink
 
 async def main(args):
     logger = loguru.logger
     logger.add(args.log, rotation="10MB", retention=3)
 
-    mongo = motor_asyncio.AsyncIOMotorClient()
-    db = mongo[args.db]
-    collection = db[args.collection + "." + args.symbol + "." + args.perp_or_future]
+    mongo = pymongo.MongoClient()
+    collection = args.collection + "." + args.symbol + "." + args.perp_or_future
+    # 取引所ごとのsnapshotをbufferし、まとめてbulk_writeする
+    sink = MongoSink(mongo[args.db], batch_size=1000, flush_interval=300)
 
-    api = API(args.api_key)
+    api = AsyncAPI(args.api_key, parse_executor=True)
 
-    while True:
-        df = api.margin_market_capture(args.symbol, perp_or_future=args.perp_or_future)
-        d = df.to_dict('list')
-        d['created_at'] = datetime.utcnow()
-        logger.info(d)
-        await collection.insert_one(d)
-        await asyncio.sleep(args.interval)
+    try:
+        while True:
+            df = await api.margin_market_capture(args.symbol, perp_or_future=args.perp_or_future)
+            df['created_at'] = datetime.utcnow()
+            logger.info(df.to_dict('list'))
+            await asyncio.to_thread(sink.write, collection, df, ["timestamp", "exchangeName"])
+            await asyncio.sleep(args.interval)
+    finally:
+        sink.close()
 
 if __name__ == '__main__':
     from argparse import ArgumentParser
@@ -10,6 +10,24 @@ package_data = \
 install_requires = \
 ['pandas>=1.4.2,<2.0.0', 'requests>=2.27.1,<3.0.0']
 
+extras_require = \
+{'all': ['httpx>=0.23.0',
+         'h2>=4.1.0',
+         'orjson>=3.6.0',
+         'PyYAML>=6.0',
+         'pymongo>=4.0',
+         'pyarrow>=8.0.0',
+         'prometheus-client>=0.14.0',
+         'opentelemetry-api>=1.11.0'],
+ 'async': ['httpx>=0.23.0'],
+ 'http2': ['httpx>=0.23.0', 'h2>=4.1.0'],
+ 'mongo': ['pymongo>=4.0'],
+ 'orjson': ['orjson>=3.6.0'],
+ 'otel': ['opentelemetry-api>=1.11.0'],
+ 'parquet': ['pyarrow>=8.0.0'],
+ 'prometheus': ['prometheus-client>=0.14.0'],
+ 'yaml': ['PyYAML>=6.0']}
+
 setup_kwargs = {
     'name': 'pycoinglass',
     'version': '0.1.0',
@@ -23,6 +41,7 @@ setup_kwargs = {
     'packages': packages,
     'package_data': package_data,
     'install_requires': install_requires,
+    'extras_require': extras_require,
     'python_requires': '>=3.9.0,<4.0.0',
 }
 
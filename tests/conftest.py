@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from pycoinglass import API, AsyncAPI, Request
+from pycoinglass.replay import record, redirect
+from pycoinglass.server import StandInServer
+
+# 全エンドポイント (method, args) -> `DataParser` のメソッド名
+REQUESTS = {
+    Request("exchange_open_interest_official", "BTC"): 'records',
+    Request("exchange_open_interest_chart_official", "BTC"): 'exchange_open_interest_chart',
+    Request("liquidation_official", "BTC", "Binance"): 'liquidation',
+    Request("liquidation_chart_official", "BTC"): 'liquidation_chart',
+    Request("long_short_chart_official", "BTC"): 'long_short_chart',
+    Request("funding_rate_chart_official", "BTC", interval="1h"): 'funding_rate_chart',
+    Request("exchange_vol_official", "BTC"): 'exchange_vol',
+    Request("margin_market_capture", "BTC"): 'margin_market_capture',
+    Request("exchange_open_interest", "BTC", period="all"): 'exchange_open_interest',
+    Request("liquidation_chart", "BTC", "1m"): 'liquidation_chart',
+    Request("liquidation_history", "BTC"): 'liquidation_history',
+    Request("long_short_chart", "BTC", "5m"): 'long_short_chart',
+    Request("funding_rate_chart", "BTC"): 'funding_rate_chart',
+}
+
+
+@pytest.fixture(scope="session")
+def fixtures(tmp_path_factory):
+    """ 合成データを1度だけ記録したfixture (以降のレスポンスは時刻によらず同じ)。 """
+    directory = str(tmp_path_factory.mktemp("fixtures"))
+    random.seed(0)
+    with StandInServer(size=300, seed=0) as server:
+        api = record(redirect(API("test"), server.url), directory)
+        for req in REQUESTS:
+            req(api)
+        api.close()
+    return directory
+
+
+@pytest.fixture(scope="session")
+def server(fixtures):
+    with StandInServer(fixtures) as server:
+        yield server
+
+
+@pytest.fixture
+def make_api(server):
+    """ :return: function of `API` kwargs -> `API` pointed at the stand-in server """
+    apis = []
+
+    def make(**kwargs):
+        api = redirect(API("test", **kwargs), server.url)
+        apis.append(api)
+        return api
+
+    yield make
+    for api in apis:
+        api.close()
+
+
+@pytest.fixture
+def make_async_api(server):
+    def make(**kwargs):
+        return redirect(AsyncAPI("test", **kwargs), server.url)
+
+    return make
+
+
+def assert_result_equal(expected, actual):
+    """ DataFrame、namedtuple、numpyの配列のdictを比較する。 """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(expected, tuple):
+        assert type(expected)._fields == type(actual)._fields
+        for e, a in zip(expected, actual):
+            assert_result_equal(e, a)
+    elif isinstance(expected, dict):
+        assert expected.keys() == actual.keys()
+        for k in expected:
+            assert_result_equal(expected[k], actual[k])
+    elif isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(expected, actual)
+    else:
+        np.testing.assert_array_equal(expected, actual)
@@ -0,0 +1,118 @@
+""" 変更前 (datetimeを1要素ずつ作り、liquidation_chartは時間足ごとにDataFrameを作っていた) のDataParser。
+
+出力が変わっていないことの確認にだけ使う。
+"""
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import pandas as pd
+
+
+def fromtimestamp(ts):
+    return datetime.fromtimestamp(ts / 1000, timezone.utc)
+
+
+class LegacyParser:
+    @staticmethod
+    def margin_market_capture(data):
+        df = pd.DataFrame(data)
+        df['timestamp'] = list(map(fromtimestamp, df['updateTime']))
+        df.sort_values("exchangeName", inplace=True)
+        df.reset_index(inplace=True)
+        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
+        df.rename(columns={"index": "rank"}, inplace=True)
+        return df
+
+    @staticmethod
+    def exchange_open_interest(data):
+        df = pd.DataFrame(data['dataMap'])
+        df['timestamp'] = list(map(fromtimestamp, data['dateList']))
+        df.set_index('timestamp', inplace=True)
+        df.sort_index(inplace=True)
+        df['price'] = data['priceList']
+        return df
+
+    @staticmethod
+    def exchange_open_interest_chart(data):
+        df = pd.concat([
+            pd.DataFrame(map(fromtimestamp, data['dateList']), columns=['timestamp']),
+            pd.DataFrame(data['priceList'], columns=['price']),
+            pd.DataFrame(data['dataMap']),
+        ], axis=1).set_index('timestamp').sort_index()
+        return df
+
+    @staticmethod
+    def liquidation(data):
+        df = pd.DataFrame(data)
+        df['timestamp'] = list(map(fromtimestamp, df.dateList))
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    @staticmethod
+    def liquidation_chart(data):
+        data_all, data_list = [], {}
+        for item in data:
+            new_item = {}
+            for k, v in item.items():
+                if k == 'list':
+                    data_list[fromtimestamp(item['createTime'])] = pd.DataFrame(v).set_index("exchangeName")
+                    continue
+                if k == 'createTime':
+                    k = 'timestamp'
+                    v = fromtimestamp(v)
+                new_item[k] = v
+            data_all.append(new_item)
+        df = pd.DataFrame(data_all).set_index('timestamp').sort_index()
+        df_by_exchange = pd.concat(data_list)
+        df_by_exchange.index.names = ['timestamp', 'exchange']
+
+        LiquidationChart = namedtuple('LiquidationChart', ('total', 'exchange'))
+
+        return LiquidationChart(df, df_by_exchange)
+
+    @staticmethod
+    def liquidation_history(data):
+        df = pd.DataFrame(data['list'])
+        df.side.replace({1: "BUY", 2: "SELL"}, inplace=True)
+        df['timestamp'] = list(map(fromtimestamp, df.createTime))
+        df['timestamp_turnover'] = list(map(fromtimestamp, df.turnoverTime))
+        df.drop(columns=["exchangeLogo", "symbolLogo"], inplace=True)
+        return df
+
+    @staticmethod
+    def funding_rate_chart(data):
+        datelist = list(map(fromtimestamp, data['dateList']))
+        dfs = []
+        for k in ['dataMap', 'frDataMap']:
+            df = pd.DataFrame(data[k])
+            if len(df) == len(data['priceList']):
+                df['price'] = data['priceList']
+            if len(df) == len(datelist):
+                df.index = datelist
+                df.index.name = "timestamp"
+            dfs.append(df)
+
+        FundingRateChart = namedtuple('FundingRateCharts', ('predicted', 'following'))
+
+        return FundingRateChart(*dfs)
+
+    @staticmethod
+    def long_short_chart(data):
+        df = pd.DataFrame(data)
+        df.rename(columns={
+            "dateList": "timestamp",
+            "longRateList": "longRate", "shortsRateList": "shortRate",
+            "longShortRateList": "longShortRate",
+            "priceList": "price",
+        }, inplace=True)
+        df['timestamp'] = list(map(fromtimestamp, df.timestamp))
+        df.set_index("timestamp", inplace=True)
+        df.sort_index(inplace=True)
+        return df
+
+    @staticmethod
+    def exchange_vol(data):
+        df = pd.DataFrame(data['dataMap'])
+        df['total'] = data['priceList']
+        df.index = list(map(fromtimestamp, data['dateList']))
+        return df
@@ -0,0 +1,98 @@
+""" 逐次更新した指標が、全期間をpandasのrollingで計算し直した値と同じであること。 """
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pycoinglass import DataParser, FundingRateChart, LiquidationChart
+from pycoinglass.analytics import FundingZScore, LiquidationImbalance, LongShortMomentum, OIDelta
+from pycoinglass.server import PAYLOADS
+
+SIZE = 200
+CHUNKS = [120, 1, 1, 7, 1, 30, 40]
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+def chunks(df):
+    """ 全体を `CHUNKS` の大きさに分ける (1本ずつの更新とまとめた更新の両方)。 """
+    ends = np.cumsum(CHUNKS)
+    return [df.iloc[start:end] for start, end in zip(np.r_[0, ends[:-1]], ends)]
+
+
+def incremental(indicator, parts):
+    return pd.concat([indicator.update(part) for part in parts])
+
+
+def funding():
+    chart = DataParser.funding_rate_chart(PAYLOADS['funding_rate_chart'](SIZE))
+    predicted = chart.predicted.copy()
+    predicted.iloc[50:60, 0] = np.nan
+    return predicted
+
+
+def test_funding_zscore():
+    predicted = funding()
+    zscore = FundingZScore(window=21)
+    actual = incremental(zscore, [FundingRateChart(p, p.iloc[:0]) for p in chunks(predicted)])
+
+    df = predicted.drop(columns='price')
+    rolling = df.rolling(21)
+    pd.testing.assert_frame_equal(actual, (df - rolling.mean()) / rolling.std(), check_freq=False, rtol=1e-6)
+
+
+def test_funding_zscore_revision():
+    predicted = funding()
+    zscore = FundingZScore(window=21)
+    zscore.update(predicted)
+    revised = predicted.iloc[-3:].copy()
+    revised.iloc[-1, :-1] += 1.0
+    actual = zscore.update(revised)
+
+    df = pd.concat([predicted.iloc[:-1], revised.iloc[-1:]]).drop(columns='price')
+    rolling = df.rolling(21)
+    expected = ((df - rolling.mean()) / rolling.std()).iloc[-1:]
+    pd.testing.assert_frame_equal(actual, expected, check_freq=False, rtol=1e-6)
+
+
+def test_long_short_momentum():
+    df = DataParser.long_short_chart(PAYLOADS['long_short_chart'](SIZE))
+    actual = incremental(LongShortMomentum(window=12), chunks(df))
+
+    ratio = df['longShortRate']
+    mean, std = ratio.rolling(12).mean(), ratio.rolling(12).std()
+    pd.testing.assert_series_equal(actual['mean'], mean.rename('mean'), check_freq=False, rtol=1e-6)
+    pd.testing.assert_series_equal(actual['momentum'], (ratio / mean - 1).rename('momentum'),
+                                   check_freq=False, rtol=1e-6)
+    pd.testing.assert_series_equal(actual['zscore'], ((ratio - mean) / std).rename('zscore'),
+                                   check_freq=False, rtol=1e-6)
+
+
+def test_oi_delta():
+    df = DataParser.exchange_open_interest(PAYLOADS['exchange_open_interest'](SIZE))
+    actual = incremental(OIDelta(lag=3), chunks(df))
+
+    oi = df.drop(columns='price')
+    oi = oi.assign(total=oi.sum(axis=1, min_count=1))
+    pd.testing.assert_frame_equal(actual['delta'], oi.diff(3), check_freq=False, check_names=False)
+    pd.testing.assert_frame_equal(actual['pct'], oi.pct_change(3), check_freq=False, check_names=False)
+
+
+def test_liquidation_imbalance():
+    chart = DataParser.liquidation_chart(PAYLOADS['liquidation_chart'](SIZE))
+    timestamps = chart.total.index
+    parts = [LiquidationChart(chart.total.loc[p.index],
+                              chart.exchange[chart.exchange.index.get_level_values('timestamp').isin(p.index)])
+             for p in chunks(chart.total)]
+    actual = incremental(LiquidationImbalance(window=12), parts)
+
+    wide = chart.exchange[['buyVolUsd', 'sellVolUsd']].unstack('exchange').rolling(12, min_periods=1).sum()
+    buy, sell = wide['buyVolUsd'], wide['sellVolUsd']
+    buy, sell = buy.assign(total=buy.sum(axis=1)), sell.assign(total=sell.sum(axis=1))
+    expected = (buy - sell) / (buy + sell)
+    assert (actual.index == timestamps).all()
+    pd.testing.assert_frame_equal(actual, expected, check_freq=False, check_names=False, rtol=1e-6)
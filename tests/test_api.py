@@ -0,0 +1,149 @@
+""" single flight、キャッシュ、`fetch_updates`、record/replay。 """
+import os
+import json
+import random
+import threading
+
+import pytest
+
+from pycoinglass import API, TTLCache
+from pycoinglass.replay import Response, record, redirect, replay, save_fixture
+from pycoinglass.server import PAYLOADS, StandInServer
+
+from .conftest import assert_result_equal
+
+LONG_SHORT_URL = "https://fapi.coinglass.com/api/futures/longShortChart"
+LONG_SHORT_PARAMS = dict(symbol="BTC", timeType=API.PERIODS["5m"])
+
+
+@pytest.fixture
+def slow_server(fixtures):
+    with StandInServer(fixtures, latency=0.3) as server:
+        yield server
+
+
+def concurrently(fn, n):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_flight(slow_server):
+    api = redirect(API("test"), slow_server.url)
+    results = concurrently(lambda: api.liquidation_chart("BTC", "1m"), 8)
+    assert slow_server.requests == 1
+    assert api.single_flight.coalesced == 7
+    for result in results[1:]:
+        assert_result_equal(results[0], result)
+    assert len({id(r.total) for r in results}) == len(results)
+
+
+def test_single_flight_raw_stream(slow_server):
+    api = redirect(API("test", stream=True), slow_server.url)
+    # 共有される前にbodyが読み切られていること (各threadが同じstreamを読まないこと)
+    results = concurrently(lambda: api.long_short_chart("BTC", "5m", return_df=False)._content_consumed, 8)
+    assert slow_server.requests == 1
+    assert all(results)
+
+
+def test_single_flight_disabled(slow_server):
+    api = redirect(API("test", single_flight=False), slow_server.url)
+    concurrently(lambda: api.liquidation_chart("BTC", "1m"), 4)
+    assert slow_server.requests == 4
+
+
+def test_cache(server, make_api):
+    api = make_api(cache=TTLCache())
+    before = server.requests
+    first = api.long_short_chart("BTC", "5m")
+    first.iloc[:, :] = 0  # 呼び出し側の変更はキャッシュに影響しない
+    second = api.long_short_chart("BTC", "5m")
+    assert server.requests == before + 1
+    assert (second != 0).any().any()
+
+    api.long_short_chart("BTC", "5m", return_df="compact")
+    api.long_short_chart("BTC", "5m", return_df=False)  # キャッシュしない
+    assert server.requests == before + 3
+
+
+def long_short_body(size, revised=None):
+    random.seed(0)
+    payload = {k: v[:size] for k, v in PAYLOADS['long_short_chart'](11).items()}
+    if revised is not None:
+        payload['longShortRateList'][revised] = -1.0
+    return json.dumps({'code': "0", 'msg': "success", 'data': payload}).encode()
+
+
+def test_fetch_updates(tmp_path):
+    directory = str(tmp_path)
+    api = replay(API("test"), directory)
+
+    save_fixture(directory, LONG_SHORT_URL, LONG_SHORT_PARAMS, Response(200, {}, long_short_body(10)))
+    assert len(api.fetch_updates("long_short_chart", "BTC", "5m")) == 10
+    assert len(api.fetch_updates("long_short_chart", "BTC", "5m")) == 0
+
+    # 最新の足が修正され、新しい足が1本増えた
+    save_fixture(directory, LONG_SHORT_URL, LONG_SHORT_PARAMS, Response(200, {}, long_short_body(11, revised=9)))
+    updates = api.fetch_updates("long_short_chart", "BTC", "5m")
+    full = api.long_short_chart("BTC", "5m")
+    assert_result_equal(full.iloc[9:], updates)
+
+
+def test_record_replay(server, tmp_path):
+    directory = str(tmp_path)
+    recorded = record(redirect(API("test"), server.url), directory).liquidation_chart("BTC", "1m")
+    before = server.requests
+    replayed = replay(API("test"), directory).liquidation_chart("BTC", "1m")
+    assert server.requests == before
+    assert_result_equal(recorded, replayed)
+
+    with pytest.raises(RuntimeError):
+        replay(API("test"), directory).liquidation_chart("ETH", "1m")
+
+
+def test_replay_passthrough_skips_errors(fixtures, tmp_path):
+    directory = str(tmp_path)
+    with StandInServer(fixtures, error_rate=1.0) as failing:
+        api = replay(redirect(API("test", max_retries=0), failing.url), directory, passthrough=True)
+        with pytest.raises(Exception):
+            api.liquidation_chart("BTC", "1m")
+    assert os.listdir(directory) == []
+
+    with StandInServer(fixtures) as recovered:
+        api = replay(redirect(API("test"), recovered.url), directory, passthrough=True)
+        api.liquidation_chart("BTC", "1m")
+        assert recovered.requests == 1
+        assert len(os.listdir(directory)) == 1
+
+
+@pytest.mark.parametrize("http2", [False, True])
+def test_retry_status(fixtures, http2):
+    with StandInServer(fixtures, error_rate=0.5, seed=0) as server:
+        api = redirect(API("test", http2=http2, max_retries=10, backoff_factor=0), server.url)
+        for _ in range(20):
+            api.long_short_chart("BTC", "5m")
+        api.close()
+    assert server.errors > 0
+
+
+def test_keep_alive(fixtures):
+    with StandInServer(fixtures) as server:
+        connections = []
+        process_request = server.httpd.process_request
+        server.httpd.process_request = lambda request, address: (connections.append(address),
+                                                                 process_request(request, address))
+        api = redirect(API("test", single_flight=False), server.url)
+        for _ in range(5):
+            api.long_short_chart("BTC", "5m")
+        api.close()
+    assert server.requests == 5 and len(connections) == 1
@@ -0,0 +1,55 @@
+""" `Archive.read(..., return_df="numpy")` が `ColumnarParser` と同じ形で返すことと、文字列の欠損が残ること。 """
+import numpy as np
+import pandas as pd
+import pytest
+
+from pycoinglass.archive import Archive
+
+
+def test_numpy_timestamps_in_ms(make_api, tmp_path):
+    api = make_api()
+    with Archive(str(tmp_path)) as archive:
+        archive.write("long_short_chart.BTC.5m", api.long_short_chart("BTC", "5m"))
+    expected = api.long_short_chart("BTC", "5m", return_df="numpy")
+    actual = Archive(str(tmp_path)).read("long_short_chart", "BTC", period="5m", return_df="numpy")
+    assert actual['timestamp'].dtype == np.int64
+    np.testing.assert_array_equal(actual['timestamp'], expected['timestamp'])
+
+
+def test_null_strings(tmp_path):
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime([0, 60000, 120000], unit='ms', utc=True),
+        'exchange': ["Binance", None, "OKX"],
+        'value': [1.0, np.nan, 3.0],
+    }).set_index('timestamp')
+    with Archive(str(tmp_path)) as archive:
+        archive.write("test.BTC", df)
+    # 2回目の書き込みは既存のパーティションと混ぜて保存し直す
+    with Archive(str(tmp_path)) as archive:
+        archive.write("test.BTC", df.iloc[2:])
+
+    archive = Archive(str(tmp_path))
+    pd.testing.assert_frame_equal(archive.read("test", "BTC"), df)
+    columns = archive.read("test", "BTC", return_df="numpy")
+    assert columns['exchange'].dtype == object
+    assert list(columns['exchange']) == ["Binance", None, "OKX"]
+    np.testing.assert_array_equal(columns['timestamp'], [0, 60000, 120000])
+
+
+def test_partition_on_other_datetime_column(tmp_path):
+    df = pd.DataFrame({
+        'exchangeName': ["Binance", "OKX"],
+        'updateTime': pd.to_datetime([0, 86400000], unit='ms', utc=True),
+    })
+    with Archive(str(tmp_path)) as archive:
+        archive.write("test.BTC", df)
+    archive = Archive(str(tmp_path))
+    pd.testing.assert_frame_equal(archive.read("test", "BTC"), df)
+    assert len(archive.read("test", "BTC", end="1970-01-02")) == 1
+
+
+def test_reject_frame_without_timestamp(tmp_path):
+    archive = Archive(str(tmp_path))
+    with pytest.raises(RuntimeError, match="no timestamp"):
+        archive.write("test.BTC", pd.DataFrame({'exchangeName': ["Binance"], 'openInterest': [1.0]}))
+    assert archive._size == 0
@@ -0,0 +1,49 @@
+""" jobの展開と、collectorが同じrowを何度取得してもsinkに重複して書かないこと。 """
+import asyncio
+
+from pycoinglass import AsyncAPI, Request
+from pycoinglass.collect import Collector, make_jobs
+from pycoinglass.replay import redirect
+from pycoinglass.sink import SQLiteSink
+
+
+def test_make_jobs():
+    jobs = make_jobs([
+        {'endpoint': 'liquidation_chart', 'symbols': ['BTC', 'ETH'], 'periods': ['1m', '5m']},
+        {'endpoint': 'liquidation_chart', 'symbols': ['BTC'], 'periods': ['1m'], 'interval': 10},
+        {'endpoint': 'liquidation_history', 'symbols': ['BTC']},
+        {'endpoint': 'margin_market_capture', 'symbols': ['BTC'], 'keys': ['timestamp', 'exchangeName']},
+    ])
+    by_table = {job.table: job for job in jobs}
+    assert len(jobs) == 6
+    assert by_table['liquidation_chart.BTC.1m'].interval == 10
+    assert by_table['liquidation_chart.ETH.5m'].interval == 300
+    assert by_table['liquidation_chart.ETH.5m'].request == Request('liquidation_chart', 'ETH', period='5m')
+    assert by_table['liquidation_chart.ETH.5m'].keys is None
+    assert by_table['liquidation_history.BTC'].keys is not None
+    assert by_table['margin_market_capture.BTC'].keys == ['timestamp', 'exchangeName']
+
+
+async def collect(api, sink, jobs, seconds):
+    try:
+        await asyncio.wait_for(Collector(api, sink, jobs, delay=0, jitter=0).run(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def test_collector_does_not_duplicate(server, tmp_path):
+    jobs = make_jobs([
+        {'endpoint': 'liquidation_history', 'symbols': ['BTC'], 'interval': 1, 'updates': False},
+        {'endpoint': 'long_short_chart', 'symbols': ['BTC'], 'periods': ['5m'], 'interval': 1},
+    ])
+    sink = SQLiteSink(str(tmp_path / "test.db"))
+    api = redirect(AsyncAPI("test"), server.url)
+    requests = server.requests
+    asyncio.run(collect(api, sink, jobs, 3.5))
+
+    assert server.requests - requests >= 3 * len(jobs)
+    for table in ("liquidation_history.BTC", "long_short_chart.BTC.5m"):
+        df = sink.read(table)
+        assert len(df) > 0
+        assert not df.duplicated().any()
+    sink.close()
@@ -0,0 +1,26 @@
+""" `return_df="compact"` が値を変えずに型だけを小さくすること。 """
+import numpy as np
+import pandas as pd
+
+from pycoinglass import DataParser, Exchange, Symbol
+
+
+def test_liquidation_history(make_api):
+    api = make_api()
+    full = api.liquidation_history("BTC")
+    compact = api.liquidation_history("BTC", return_df="compact")
+
+    assert list(compact['exchangeName'].cat.categories[:len(Exchange.__members__)]) == list(Exchange.__members__)
+    assert list(compact['symbol'].cat.categories[:len(Symbol.__members__)]) == list(Symbol.__members__)
+    assert compact['side'].dtype == 'category'
+    assert DataParser.bytes_per_row(compact) < DataParser.bytes_per_row(full)
+    pd.testing.assert_frame_equal(compact.astype(full.dtypes), full)
+
+
+def test_downcast_only_when_lossless():
+    df = pd.DataFrame({'exact': [1.5, 2.25, np.nan], 'inexact': [0.1, 0.2, 0.3], 'count': [1, 2, 300]})
+    compact = DataParser.compact(df)
+    assert compact['exact'].dtype == np.float32
+    assert compact['inexact'].dtype == np.float64
+    assert compact['count'].dtype == np.int16
+    pd.testing.assert_frame_equal(compact.astype(df.dtypes), df)
@@ -0,0 +1,65 @@
+""" stream=True、`ParsePool`、`AsyncAPI` の結果が通常の (1度にdecodeしてparseする) 結果と同じであること。 """
+import asyncio
+
+import pytest
+
+from pycoinglass import API, Parser, Request
+from pycoinglass.pool import ParsePool
+from pycoinglass.replay import redirect
+
+from .conftest import REQUESTS, assert_result_equal
+
+MODES = [True, "numpy", "compact"]
+
+
+def with_mode(req, return_df):
+    return Request(req.method, *req.args, **dict(req.kwargs), return_df=return_df)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ParsePool(2, min_bytes=0) as pool:
+        yield pool
+
+
+@pytest.fixture(scope="module")
+def expected(server):
+    with redirect(API("test", single_flight=False), server.url) as api:
+        return {(req, mode): with_mode(req, mode)(api) for req in REQUESTS for mode in MODES}
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_stream(make_api, expected, mode):
+    api = make_api(stream=True, single_flight=False)
+    for req in REQUESTS:
+        assert_result_equal(expected[(req, mode)], with_mode(req, mode)(api))
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_parse_pool(make_api, expected, pool, mode):
+    api = make_api(parse_pool=pool, single_flight=False)
+    results = api.fetch_many([with_mode(req, mode) for req in REQUESTS])
+    for req in REQUESTS:
+        assert_result_equal(expected[(req, mode)], results[with_mode(req, mode)])
+
+
+def test_parse_pool_error(pool):
+    with pytest.raises(RuntimeError):
+        pool.parse(Parser('records'), b'{"code":"0","msg":"fail","data":[]}')
+
+
+def test_parse_pool_does_not_fork(pool):
+    # threadを持つprocessからforkしない
+    assert pool.executor._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+@pytest.mark.parametrize("parse_pool", [False, True])
+def test_async(make_async_api, expected, pool, parse_pool):
+    async def fetch():
+        async with make_async_api(parse_pool=pool if parse_pool else None) as api:
+            return await api.fetch_many([with_mode(req, mode) for req in REQUESTS for mode in MODES])
+
+    results = asyncio.run(fetch())
+    for req in REQUESTS:
+        for mode in MODES:
+            assert_result_equal(expected[(req, mode)], results[with_mode(req, mode)])
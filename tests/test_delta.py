@@ -0,0 +1,26 @@
+""" `UpdateTracker` が新しいrowと値が変わったrowだけを返すこと。 """
+import pandas as pd
+
+from pycoinglass.delta import UpdateTracker
+
+
+def capture(rows):
+    """ margin_market_captureと同じ、名前の無いRangeIndexとtimestamp列のframe。 """
+    df = pd.DataFrame(rows, columns=['exchangeName', 'openInterest', 'timestamp'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
+    return df
+
+
+def test_reordered_rows_are_not_revised():
+    rows = [("Binance", 1.0, 0), ("OKX", 2.0, 0), ("Binance", 3.0, 60), ("OKX", 4.0, 60)]
+    tracker = UpdateTracker()
+    assert len(tracker("key", capture(rows))) == 4
+    assert len(tracker("key", capture(rows[::-1]))) == 0
+
+
+def test_revised_and_new_rows():
+    rows = [("Binance", 1.0, 0), ("OKX", 2.0, 0), ("Binance", 3.0, 60), ("OKX", 4.0, 60)]
+    tracker = UpdateTracker()
+    tracker("key", capture(rows))
+    changed = tracker("key", capture(rows[:3] + [("OKX", 5.0, 60), ("Binance", 6.0, 120)]))
+    assert list(changed['openInterest']) == [3.0, 5.0, 6.0]
@@ -0,0 +1,73 @@
+""" `fetch_many` の同時実行数が `max_concurrency` を超えないことと、失敗したリクエストの扱い。 """
+import time
+import asyncio
+import threading
+
+import pytest
+
+from pycoinglass import API, AsyncAPI, Request
+from pycoinglass.replay import redirect
+from pycoinglass.server import StandInServer
+
+
+
+class CountingServer(StandInServer):
+    """ 同時に処理しているリクエスト数の最大値を記録する。 """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def respond(self, path, params):
+        with self._count_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.1)
+            return super().respond(path, params)
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def counting_server():
+    with CountingServer(size=50, seed=0) as server:
+        yield server
+
+
+def requests():
+    return [Request("long_short_chart", s, p) for s in ["BTC", "ETH", "XRP", "LTC"] for p in ["5m", "15m"]]
+
+
+@pytest.mark.parametrize("max_workers", [None, 8])
+def test_max_concurrency(counting_server, max_workers):
+    api = redirect(API("test", max_concurrency=2), counting_server.url)
+    results = api.fetch_many(requests(), max_workers=max_workers)
+    api.close()
+    assert counting_server.requests == len(requests())
+    assert counting_server.peak == 2
+    assert all(len(df) == 50 for df in results.values())
+
+
+def test_async_max_concurrency(counting_server):
+    async def run():
+        async with redirect(AsyncAPI("test", max_concurrency=3), counting_server.url) as api:
+            return await api.fetch_many(requests())
+
+    results = asyncio.run(run())
+    assert counting_server.peak == 3
+    assert all(len(df) == 50 for df in results.values())
+
+
+def test_errors_and_duplicates(counting_server):
+    api = redirect(API("test"), counting_server.url)
+    bad = Request("long_short_chart", "BTC", "7m")
+    reqs = requests()[:2] + requests()[:2] + [bad]
+    results = api.fetch_many(reqs)
+    api.close()
+    assert list(results) == requests()[:2] + [bad]
+    assert isinstance(results[bad], Exception)
+    assert counting_server.requests == 2
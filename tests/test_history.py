@@ -0,0 +1,72 @@
+""" `iter_liquidation_history` のページ送り、ページがずれた分の重複除去、`until` での打ち切り。 """
+import json
+import asyncio
+
+import pytest
+
+from pycoinglass import API, AsyncAPI
+from pycoinglass.replay import redirect
+from pycoinglass.server import StandInServer
+
+PATH = "/api/futures/liquidation/order"
+NEWEST = 1654041600000  # 2022-06-01 (ms)
+SIZE = 20
+SHIFT = 3  # 新しい清算が入ってページがずれ、前のページの末尾が次のページの先頭に再び現れる
+
+
+def row(i):
+    t = NEWEST - i * 60000
+    return {'exchangeName': "Binance", 'symbol': "BTC", 'side': 1 + i % 2, 'price': float(i), 'volUsd': 1.0,
+            'createTime': t, 'turnoverTime': t, 'exchangeLogo': '', 'symbolLogo': ''}
+
+
+class HistoryServer(StandInServer):
+    """ 新しい順のページを返す。ページ `n` は `n - 1` ページより `SIZE - SHIFT` 行古い。 """
+
+    def __init__(self, pages):
+        super().__init__(pages=pages)
+        self.page_nums = []
+
+    def respond(self, path, params):
+        if path != PATH:
+            return super().respond(path, params)
+        page = int(params['pageNum'])
+        with self._lock:
+            self.page_nums.append(page)
+        start = (page - 1) * (SIZE - SHIFT)
+        rows = [row(i) for i in range(start, start + SIZE)] if page <= self.pages else []
+        return 200, {}, json.dumps({'code': "0", 'msg': "success", 'data': {'list': rows}, 'success': True}).encode()
+
+
+@pytest.fixture
+def history_server():
+    with HistoryServer(pages=5) as server:
+        yield server
+
+
+def collect(api, **kwargs):
+    if isinstance(api, AsyncAPI):
+        async def run():
+            return [df async for df in api.iter_liquidation_history("BTC", page_size=SIZE, **kwargs)]
+        return asyncio.run(run())
+    return list(api.iter_liquidation_history("BTC", page_size=SIZE, **kwargs))
+
+
+@pytest.fixture(params=[API, AsyncAPI])
+def api(request, history_server):
+    return redirect(request.param("test"), history_server.url)
+
+
+def test_all_pages(api):
+    dfs = collect(api, prefetch=2)
+    prices = [p for df in dfs for p in df['price']]
+    assert prices == [float(i) for i in range(4 * (SIZE - SHIFT) + SIZE)]
+
+
+def test_until(api, history_server):
+    until = NEWEST - 50 * 60000
+    dfs = collect(api, until=until, prefetch=2)
+    prices = [p for df in dfs for p in df['price']]
+    assert prices == [float(i) for i in range(51)]
+    # 51行目を含む3ページ目で打ち切り、先読みした分より先は取得しない
+    assert max(history_server.page_nums) <= 3 + 2
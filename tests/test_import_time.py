@@ -0,0 +1,25 @@
+""" `import pycoinglass` が軽いままであること (pandas/numpy/requestsとparse層をimportしない)。
+
+時間はCIのmachineで揺れるので計測しない (`benchmark/import_time.py --budget`)。
+"""
+import sys
+import subprocess
+
+from benchmark.import_time import ROOT, measure
+
+
+def test_no_heavy_imports():
+    assert measure()['loaded'] == []
+
+
+def test_raw_request_does_not_import_pandas(server):
+    script = f"""
+import sys
+from pycoinglass import API
+from pycoinglass.replay import redirect
+resp = redirect(API("test"), {server.url!r}).liquidation_chart("BTC", "1m", return_df=False)
+assert resp.status_code == 200
+print([m for m in ('pandas', 'numpy') if m in sys.modules])
+"""
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,81 @@
+""" hookの呼び出し、`Stats` の集計、Prometheus/OpenTelemetryへのexport。 """
+import pytest
+
+from pycoinglass import API, TTLCache
+from pycoinglass.instrument import Instrumentation, PHASES, Stats, current_span
+from pycoinglass.replay import redirect
+from pycoinglass.server import StandInServer
+
+ENDPOINT = "/api/futures/longShortChart"
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, span):
+        self.events.append(('before', span.endpoint))
+
+    def after_request(self, span):
+        self.events.append(('after', span.endpoint, span.status_code, span.rows, span.error))
+
+
+def test_hooks_and_stats(make_api):
+    stats, recorder = Stats(), Recorder()
+    api = make_api(instrumentation=Instrumentation(recorder, stats), cache=TTLCache())
+    df = api.long_short_chart("BTC", "5m")
+    api.long_short_chart("BTC", "5m")  # cache
+
+    assert recorder.events == [
+        ('before', ENDPOINT), ('after', ENDPOINT, 200, len(df), None),
+        ('before', ENDPOINT), ('after', ENDPOINT, None, len(df), None),  # キャッシュはリクエストしない
+    ]
+    assert current_span() is None
+    summary = stats.summary().loc[ENDPOINT]
+    assert summary['requests'] == 2 and summary['cached'] == 1 and summary['errors'] == 0
+    assert summary['rows'] == 2 * len(df) and summary['bytes'] > 0
+    assert set(stats.seconds) >= {(ENDPOINT, phase) for phase in PHASES}
+
+
+def test_error(fixtures):
+    stats = Stats()
+    with StandInServer(fixtures, error_rate=1.0) as server:
+        api = redirect(API("test", instrumentation=Instrumentation(stats), max_retries=0), server.url)
+        with pytest.raises(Exception):
+            api.long_short_chart("BTC", "5m")
+        api.close()
+    assert stats.errors[ENDPOINT] == 1
+
+
+def test_prometheus(make_api):
+    prom = pytest.importorskip("prometheus_client")
+    from pycoinglass.instrument import PrometheusExporter
+
+    registry = prom.CollectorRegistry()
+    api = make_api(instrumentation=Instrumentation(PrometheusExporter(registry)))
+    df = api.long_short_chart("BTC", "5m")
+
+    labels = {'endpoint': ENDPOINT}
+    assert registry.get_sample_value("pycoinglass_requests_total", dict(labels, status="200")) == 1
+    assert registry.get_sample_value("pycoinglass_rows_total", labels) == len(df)
+    assert registry.get_sample_value("pycoinglass_request_duration_seconds_count", labels) == 1
+
+
+def test_opentelemetry(make_api):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from pycoinglass.instrument import OpenTelemetryExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    api = make_api(instrumentation=Instrumentation(OpenTelemetryExporter(provider.get_tracer("test"))))
+    api.long_short_chart("BTC", "5m")
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    root = spans[f"GET {ENDPOINT}"]
+    assert root.attributes["http.status_code"] == 200
+    assert set(PHASES) <= set(spans)
+    assert all(spans[phase].parent.span_id == root.context.span_id for phase in PHASES)
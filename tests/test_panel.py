@@ -0,0 +1,39 @@
+""" `build_panel` が各系列をas-ofで共通の時間軸に揃えること。 """
+import numpy as np
+import pandas as pd
+
+from pycoinglass import Request
+from pycoinglass.panel import Field, build_from_results, build_panel
+
+FIELDS = {'ratio': Field('long_short_chart', lambda df: df['longShortRate'], 'period', {})}
+
+
+def series(times, values):
+    index = pd.to_datetime(times, utc=True).rename('timestamp')
+    return pd.DataFrame({'longShortRate': values}, index=index)
+
+
+def test_as_of_alignment():
+    results = {
+        Request('long_short_chart', 'BTC', period='1h'): series(["2022-06-01 00:00", "2022-06-01 02:00"], [1.0, 2.0]),
+        Request('long_short_chart', 'ETH', period='1h'): series(["2022-06-01 01:30"], [3.0]),
+        Request('long_short_chart', 'XRP', period='1h'): RuntimeError("failed"),
+    }
+    df = build_from_results(results, ["BTC", "ETH", "XRP"], FIELDS, period="1h")
+    assert list(df.index) == list(pd.date_range("2022-06-01 00:00", periods=3, freq="1h", tz="UTC"))
+    np.testing.assert_array_equal(df[('BTC', 'ratio')], [1.0, 1.0, 2.0])
+    np.testing.assert_array_equal(df[('ETH', 'ratio')], [np.nan, np.nan, 3.0])
+    assert df[('XRP', 'ratio')].isna().all()
+
+    panel = build_from_results(results, ["BTC", "ETH", "XRP"], FIELDS, period="1h", return_df="numpy")
+    assert panel.values.shape == (3, 3, 1)
+    np.testing.assert_array_equal(panel.values.reshape(3, -1), df.values)
+
+
+def test_build_panel(make_api):
+    api = make_api()
+    df = build_panel(api, ["BTC", "ETH"], period="1h")
+    panel = build_panel(api, ["BTC", "ETH"], period="1h", return_df="numpy")
+    assert panel.values.shape == (len(df), 2, len(panel.field))
+    np.testing.assert_array_equal(panel.values.reshape(len(df), -1), df.values)
+    assert df[('BTC', 'open_interest')].notna().any()
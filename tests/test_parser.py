@@ -0,0 +1,41 @@
+""" `DataParser` の出力が変更前の実装と同じであること (timestampのvectorize、liquidation_chartの一括構築)。 """
+import random
+
+import pandas as pd
+import pytest
+
+from pycoinglass import API, DataParser, Request
+from pycoinglass.server import PAYLOADS
+
+from .conftest import REQUESTS, assert_result_equal
+from .legacy import LegacyParser
+
+
+def legacy(name, data):
+    if name == 'records':
+        return pd.DataFrame(data)
+    return getattr(LegacyParser, name)(data)
+
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+@pytest.mark.parametrize("size", [1, 50, 500])
+def test_same_as_legacy(name, size):
+    random.seed(size)
+    data = PAYLOADS[name](size)
+    assert_result_equal(legacy(name, data), getattr(DataParser, name)(data))
+
+
+def test_liquidation_chart_unsorted():
+    random.seed(0)
+    data = PAYLOADS['liquidation_chart'](20)
+    data = data[10:] + data[:10]
+    assert_result_equal(LegacyParser.liquidation_chart(data), DataParser.liquidation_chart(data))
+
+
+@pytest.mark.parametrize("req", list(REQUESTS), ids=str)
+def test_endpoint_same_as_legacy(make_api, req):
+    api = make_api()
+    data = API._validate_response(Request(req.method, *req.args, **dict(req.kwargs), return_df=False)(api))
+    if req.method == "margin_market_capture":
+        data = data[req.args[0]]
+    assert_result_equal(legacy(REQUESTS[req], data), req(api))
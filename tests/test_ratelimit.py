@@ -0,0 +1,97 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from pycoinglass import RateLimiter
+
+
+def test_priority_async():
+    async def main():
+        limiter = RateLimiter(20, per=1.0, burst=1)
+        limiter.acquire()
+        order = []
+
+        async def acquire(name, priority):
+            await limiter.acquire_async(priority)
+            order.append(name)
+
+        low = [asyncio.create_task(acquire(f"low{i}", 10)) for i in range(16)]
+        await asyncio.sleep(0)
+        high = [asyncio.create_task(acquire(f"high{i}", -10)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert limiter.metrics.queue_depth == 19
+        await asyncio.gather(*low, *high)
+        return order
+
+    order = asyncio.run(main())
+    assert order[:3] == ["high0", "high1", "high2"]
+    assert order[3:] == [f"low{i}" for i in range(16)]
+
+
+def test_rate_async():
+    async def main():
+        limiter = RateLimiter(20, per=1.0, burst=1)
+        start = time.monotonic()
+        await asyncio.gather(*[limiter.acquire_async() for _ in range(6)])
+        return time.monotonic() - start, limiter.metrics
+
+    elapsed, metrics = asyncio.run(main())
+    assert elapsed == pytest.approx(0.25, abs=0.1)
+    assert metrics.acquired == 6
+    assert metrics.queue_depth == 0
+
+
+def test_cancel_returns_token():
+    async def main():
+        limiter = RateLimiter(2, per=1.0, burst=1)
+        limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert limiter.metrics.queue_depth == 0
+
+        # 待ちが無くなったので、次のトークン (0.5秒後) は後から来た呼び出し元が受け取る
+        start = time.monotonic()
+        await limiter.acquire_async()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_cancel_after_grant_refunds():
+    async def main():
+        limiter = RateLimiter(1, per=10.0, burst=1)
+        task = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)  # トークンは渡されたが、taskはまだ再開していない
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.wait_for(limiter.acquire_async(), 1.0)
+
+    asyncio.run(main())
+
+
+def test_threads_and_async_share_queue():
+    limiter = RateLimiter(20, per=1.0, burst=1)
+    limiter.acquire()
+    order = []
+
+    def blocking():
+        limiter.acquire(0)
+        order.append("thread")
+
+    async def main():
+        thread = threading.Thread(target=blocking)
+        thread.start()
+        await asyncio.sleep(0.01)
+        await limiter.acquire_async(-1)
+        order.append("async")
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(main())
+    assert order == ["async", "thread"]
+    assert limiter.metrics.acquired == 3
@@ -0,0 +1,55 @@
+""" 列ごとの集計方法と、`Resampler` の増分の結果が `resample` と同じであること。 """
+import numpy as np
+import pandas as pd
+
+from pycoinglass import LiquidationChart
+from pycoinglass.resample import resample, Resampler, rules
+
+# 05:15の15分足は05:28からしか揃っていない
+INDEX = pd.date_range("2022-06-01 05:28", periods=600, freq="1min", tz="UTC", name="timestamp")
+
+
+def chart():
+    rng = np.random.default_rng(0)
+    total = pd.DataFrame({
+        'buyVolUsd': rng.random(len(INDEX)),
+        'sellVolUsd': rng.random(len(INDEX)),
+        'price': 20000 + np.arange(len(INDEX), dtype=float),
+    }, index=INDEX)
+    exchange = pd.DataFrame(
+        {'buyVolUsd': rng.random(2 * len(INDEX)), 'sellVolUsd': rng.random(2 * len(INDEX))},
+        index=pd.MultiIndex.from_product([INDEX, ["Binance", "OKX"]], names=["timestamp", "exchange"]))
+    return LiquidationChart(total, exchange)
+
+
+def test_price_is_not_summed():
+    result = chart()
+    out = resample(result, "1h", rules("liquidation_chart"))
+    bar = result.total.loc["2022-06-01 06:00":"2022-06-01 06:59"]
+    assert list(out.total.columns) == ['buyVolUsd', 'sellVolUsd', 'price']
+    assert out.total.loc["2022-06-01 06:00", 'price'] == bar['price'].iloc[0]
+    assert np.isclose(out.total.loc["2022-06-01 06:00", 'buyVolUsd'], bar['buyVolUsd'].sum())
+
+
+def test_first_update_drops_partial_bar():
+    result = chart()
+    out = Resampler("liquidation_chart", ["15m"]).update(result)["15m"]
+    assert out.total.index[0] == pd.Timestamp("2022-06-01 05:30", tz="UTC")
+    pd.testing.assert_frame_equal(out.total, resample(result.total, "15m", rules("liquidation_chart")))
+
+
+def test_incremental_matches_resample():
+    result = chart()
+    resampler = Resampler("liquidation_chart", ["5m", "1h"])
+    updates = {"5m": [], "1h": []}
+    for i in range(0, len(INDEX), 7):
+        start, end = INDEX[max(i - 2, 0)], INDEX[min(i + 6, len(INDEX) - 1)]
+        part = LiquidationChart(result.total.loc[start:end], result.exchange.loc[start:end])
+        for period, out in resampler.update(part).items():
+            updates[period].append(out)
+    for period, outs in updates.items():
+        expected = resample(result, period, rules("liquidation_chart"))
+        for field in LiquidationChart._fields:
+            df = pd.concat([getattr(out, field) for out in outs])
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+            pd.testing.assert_frame_equal(df, getattr(expected, field), check_freq=False)
@@ -0,0 +1,71 @@
+""" 呼び出し元の1人が結果を書き換えても、他の呼び出し元の結果は変わらないこと。 """
+import time
+import asyncio
+import threading
+
+import pandas as pd
+
+from pycoinglass.singleflight import SingleFlight, AsyncSingleFlight
+
+
+def frame():
+    return pd.DataFrame({'a': [0.0, 0.0, 0.0]})
+
+
+def test_mutation_is_not_shared():
+    flight = SingleFlight()
+    started = threading.Event()
+    results = []
+
+    def fn():
+        started.set()
+        time.sleep(0.2)
+        return frame()
+
+    def call(mutate):
+        df = flight.do("key", fn)
+        if mutate:
+            df.values[:] = 1
+        results.append(df)
+
+    leader = threading.Thread(target=call, args=(True,))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call, args=(False,)) for _ in range(8)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert flight.coalesced == 8
+    assert sum((df['a'] == 1).all() for df in results) == 1
+    assert sum((df['a'] == 0).all() for df in results) == 8
+
+
+def test_mutation_is_not_shared_async():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            return frame()
+
+        async def call(mutate):
+            df = await flight.do("key", fn)
+            if mutate:
+                df.values[:] = 1
+            return df
+
+        results = await asyncio.gather(call(True), *[call(False) for _ in range(8)])
+        assert flight.coalesced == 8
+        return results
+
+    results = asyncio.run(main())
+    assert (results[0]['a'] == 1).all()
+    assert all((df['a'] == 0).all() for df in results[1:])
+
+
+def test_share_without_copy():
+    flight = SingleFlight()
+    value = object()
+    assert flight.do("key", lambda: value, copy=None) is value
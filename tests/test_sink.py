@@ -0,0 +1,72 @@
+""" `write` が止まっても `flush_interval` 後にbufferが保存されることと、書き込みに失敗したrowが残ること。 """
+import time
+
+import pandas as pd
+import pytest
+
+from pycoinglass.sink import SQLiteSink
+
+
+def frame():
+    index = pd.date_range("2022-06-01", periods=3, freq="1min", tz="UTC", name="timestamp")
+    return pd.DataFrame({'value': [1.0, 2.0, 3.0]}, index=index)
+
+
+def test_flush_on_interval(tmp_path):
+    with SQLiteSink(str(tmp_path / "test.db"), batch_size=1000, flush_interval=0.2) as sink:
+        sink.write("test", frame())
+        assert sink._size == 3
+        deadline = time.monotonic() + 5
+        while sink._size > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with sink._lock:  # flushの書き込みが終わるまで待つ
+            assert len(sink.read("test")) == 3
+
+
+def test_close_cancels_timer(tmp_path):
+    sink = SQLiteSink(str(tmp_path / "test.db"), batch_size=1000, flush_interval=60)
+    sink.write("test", frame())
+    timer = sink._timer
+    sink.close()
+    timer.join(1)
+    assert sink._timer is None and not timer.is_alive()
+
+
+class FlakySink(SQLiteSink):
+    """ `fail` の間は `_write` がConnectionErrorになる。 """
+
+    fail = True
+
+    def _write(self, table, df, keys):
+        if self.fail:
+            raise ConnectionError("down")
+        super()._write(table, df, keys)
+
+
+def test_failed_write_is_kept(tmp_path):
+    sink = FlakySink(str(tmp_path / "test.db"), batch_size=1000, flush_interval=60)
+    sink.write("test", frame())
+    sink.write("other", frame())
+    with pytest.raises(ConnectionError):
+        sink.flush()
+    assert sink._size == 6
+
+    sink.fail = False
+    sink.close()
+    assert sink._size == 0
+    sink = SQLiteSink(str(tmp_path / "test.db"))
+    assert len(sink.read("test")) == 3 and len(sink.read("other")) == 3
+
+
+def test_timer_retries_failed_write(tmp_path):
+    sink = FlakySink(str(tmp_path / "test.db"), batch_size=1000, flush_interval=0.1)
+    sink.write("test", frame())
+    time.sleep(0.3)
+    assert sink._size == 3
+    sink.fail = False
+    deadline = time.monotonic() + 5
+    while sink._size > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    with sink._lock:
+        assert len(sink.read("test")) == 3
+    sink.close()